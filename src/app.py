@@ -1,84 +1,245 @@
-from flask import Flask, request, render_template, Response, jsonify
+import io
+import json
+from flask import Flask, request, render_template, Response, jsonify, stream_with_context
+import os
 import random
-from sudoku import ClassicSudoku
+import threading
+import time
+from sudoku import ClassicSudoku, SolverStats, SolveTimeout, SudokuError, InvalidPuzzle, Contradiction
+from cache import SolutionCache
+from canonical import Canonicalize, ApplyTransform, InvertTransform
+from corpus import puzzle, answer
+from generator import Grade, GradeTracer, ReadPool, gradeLevels, levelNames, techniqueGrades
+from store import PuzzleStore
+from packed import PackedWriter
 
 app = Flask(__name__)
+app.config['SOLUTION_CACHE_SIZE'] = int(os.environ.get('SOLUTION_CACHE_SIZE', 1024))
+app.config['SOLUTION_CACHE_TTL'] = float(os.environ['SOLUTION_CACHE_TTL']) if 'SOLUTION_CACHE_TTL' in os.environ else None
+app.config['SOLUTION_CACHE_CANONICAL'] = os.environ.get('SOLUTION_CACHE_CANONICAL', '0') == '1'
+app.config['PUZZLE_POOL'] = os.environ.get('PUZZLE_POOL')
+app.config['DISPLAY_PAGE_SIZE'] = int(os.environ.get('DISPLAY_PAGE_SIZE', 100))
+app.config['DISPLAY_PAGE_SIZE_MAX'] = int(os.environ.get('DISPLAY_PAGE_SIZE_MAX', 1000))
+app.config['SOLVE_TIME_LIMIT'] = float(os.environ.get('SOLVE_TIME_LIMIT', 5.0))
+app.config['API_SOLVE_MAX'] = int(os.environ.get('API_SOLVE_MAX', 1000))
+app.config['REQUEST_TIMEOUT'] = float(os.environ.get('REQUEST_TIMEOUT', 10.0))
+app.config['SOLVER_SCHEDULE'] = os.environ.get('SOLVER_SCHEDULE', '')
+app.config['SOLVER_SCHEDULE_INTERVAL'] = int(os.environ.get('SOLVER_SCHEDULE_INTERVAL', 1000))
+app.config['PUZZLE_STORE'] = os.environ.get('PUZZLE_STORE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles.dat'))
 
-"""
-Sudoku Puzzles
-"""
-
-puzzle = [  # Just for test
-            "009053074500720063723080950000001002002000400400200000086010547970038006210670300" ,
-            "607320500420089700000001030200007098090806050370900001040600000001290064006078103",
-            # A to Z of Sudoku. Chapter 2
-            "640509800000030070308010004000007000400965007000300000800090403020050000003604092",
-            "090206018010000000000500906604000830000402000089000201201009000000000060930801020",
-            "640000080210000000380010067758621349923457816461000752104278605576130028802000070",
-            "003500040075860000012070000000210003006300508000000120030050400680000070701000000",
-            "600812030300050627020000080007528004000000018000043000050604200003001000100070800",
-            "409070300310590400602483109534768921290314705701259043045037200000025034023040507",
-            "063501047075860000012070050548219763126347598397685124239750400684100075751000000",
-            "067542001234000007000000246046705100000196004009004060458000010703400685600853470",
-            "014000900030491070789200041041000200860000497007000160170902004000310720008000510",
-            # A to Z of Sudoku. Chapter 2 and 3
-            "903050006000000070086007509000006002605083090000002060000370008042098000039000004",
-            # A to Z of Sudoku. Chapter 3
-            "973051206254009070186007509000006002625083090000002060561374928742198600839005714",
-            "891576234600100978200900516786000091510060000340701600908007000400003000160840020"
-            ]
-
-
-puzzle_nonw = [  # A to Z of Sudoku. Chapter 3
-            "106089734840300000030100080385491672764823050200675348678000013000038467403716805",
-            "100049586095700140064150700530812407700604051001500020010080970008900210050401008",
-            "800945172942176300157283009594700000018304200020508014001800500009657021205400006",
-            "028000395306000178010830642137529864000080010680140500561078400293400786874000051",
-            "640009080800400600090308050079082000400076000000000800728000590900850706060090000"
-    ]
-
-answer = [  # Just for test
-            "869153274541729863723486951658341792192867435437295618386912547974538126215674389",
-            "617324589423589716589761432265147398194836257378952641842613975731295864956478123",
-            # A to Z of Sudoku. Chapter 2
-            "642579831159438276378216954536827149481965327297341685865792413924153768713684592",
-            "597236418816974352342518976624197835153482697789653241261749583478325169935861724",
-            "645793281217846593389512467758621349923457816461389752194278635576134928832965174",
-            "963521847475863219812974356548219763126347598397685124239756481684132975751498632",
-            "679812435381459627524367189917528364432796518865143972758634291243981756196275843",
-            "459172368318596472672483159534768921296314785781259643945837216167925834823641597",
-            "963521847475863219812974356548219763126347598397685124239756481684132975751498632",
-            "867542391234961857915378246346785129582196734179234568458627913723419685691853472",
-            "614837952532491876789265341941786235865123497327549168173952684456318729298674513",
-            # A to Z of Sudoku. Chapter 2 and 3
-            "973451286254869173186237549317946852625783491498512367561374928742198635839625714",
-            # A to Z of Sudoku. Chapter 3
-            "973451286254869173186237549317946852625783491498512367561374928742198635839625714",
-            "891576234635124978274938516786452391512369847349781652958217463427693185163845729"
-            ]
+solutionCache = SolutionCache(app.config['SOLUTION_CACHE_SIZE'], app.config['SOLUTION_CACHE_TTL'])
+solverStats = SolverStats()
+solverStatsLock = threading.Lock()
+
+def ParseSchedule(strSchedule):
+    """
+    This function parses SOLVER_SCHEDULE: '' for default order, 'adaptive', or comma separated technique names.
+    Returns:
+        Tuple of technique names, None for default order or 'adaptive'
+    """
+    if strSchedule in ('', 'adaptive'):
+        return None
+    schedule = tuple(name.strip() for name in strSchedule.split(','))
+    for name in schedule:
+        if name not in ClassicSudoku.techniqueOrder:
+            raise ValueError("SOLVER_SCHEDULE: unknown technique %s, expected one of %s"
+                             % (name, ', '.join(ClassicSudoku.techniqueOrder)))
+    return schedule
+
+# Technique order of the solver, reordered by the measured cost every SOLVER_SCHEDULE_INTERVAL solves when adaptive
+solverSchedule = ParseSchedule(app.config['SOLVER_SCHEDULE'])
+solverScheduleSolves = 0
+
+def GetSchedule():
+    global solverSchedule, solverScheduleSolves
+    if app.config['SOLVER_SCHEDULE'] == 'adaptive':
+        with solverStatsLock:
+            if solverStats.solves - solverScheduleSolves >= app.config['SOLVER_SCHEDULE_INTERVAL']:
+                solverSchedule = ClassicSudoku.ScheduleByStats(solverStats)
+                solverScheduleSolves = solverStats.solves
+    return solverSchedule
+
+puzzleStore = PuzzleStore(app.config['PUZZLE_STORE'], grader=Grade)
+
+def LoadPuzzleStore():
+    """
+    This function fills a new puzzle store with the bundled puzzles, graded, and appends the puzzles of the pool
+    written by generator.py, which are not in the store yet. So a pool set after the store was created is
+    imported at next start, and the submitted puzzles are kept.
+    """
+    if not len(puzzleStore):
+        records = [(strInput, strAnswer, Grade(strInput)) for strInput, strAnswer in zip(puzzle, answer)]
+        records.extend((strInput, None, Grade(strInput)) for strInput in puzzle[len(answer):])
+        puzzleStore.AppendMany(records, onlyIfEmpty=True)
+    if app.config['PUZZLE_POOL']:
+        with open(app.config['PUZZLE_POOL']) as fileInput:
+            puzzleStore.AppendMany(ReadPool(fileInput), onlyNew=True)
+
+LoadPuzzleStore()
+
+def ChoosePuzzle(level):
+    """
+    This function returns index of random puzzle of the difficulty level, None if there is no such puzzle.
+    """
+    gradeIndex = puzzleStore.GetIndexByGrade()
+    listIndex = [gradeIndex.get(grade, ()) for grade, gradeLevel in enumerate(gradeLevels) if gradeLevel == level]
+    choice = random.randrange(sum(map(len, listIndex)) or 1)
+    for listIndexOfGrade in listIndex:
+        if choice < len(listIndexOfGrade):
+            return listIndexOfGrade[choice]
+        choice -= len(listIndexOfGrade)
+    return None
+
+def SolveCached(strInput, timeLimit=None):
+    """
+    This function returns solution of the puzzle, from solutionCache when possible.
+    The exact puzzle string is looked up first. On miss, when SOLUTION_CACHE_CANONICAL is set, the canonical
+    form is looked up, so that puzzles equivalent by symmetry share one cached solution.
+    Canonicalize costs several solves, so it pays off only when equivalent puzzles are requested often.
+    Raises SolveTimeout, if the solve does not finish within timeLimit seconds (default SOLVE_TIME_LIMIT),
+    and InvalidPuzzle, if the puzzle is not valid. A puzzle without solution returns ''.
+    """
+    if not ClassicSudoku.IsValidInput(strInput):
+        raise InvalidPuzzle("Input not valid")
+    strOutput = solutionCache.Get(strInput)
+    if strOutput is not None:
+        return strOutput
+
+    strCanonical = None
+    if app.config['SOLUTION_CACHE_CANONICAL']:
+        strCanonical, transform = Canonicalize(strInput)
+        strCanonicalOutput = solutionCache.Get(strCanonical)
+        if strCanonicalOutput is not None:
+            strOutput = InvertTransform(strCanonicalOutput, transform) if strCanonicalOutput else ''
+            solutionCache.Put(strInput, strOutput)
+            return strOutput
+
+    s = ClassicSudoku()
+    s.stats = SolverStats()
+    s.schedule = GetSchedule()
+    try:
+        s.Load(strInput)
+        s.Solve(app.config['SOLVE_TIME_LIMIT'] if timeLimit is None else timeLimit)
+        strOutput = s.strOutput
+    except Contradiction:
+        strOutput = ''
+    finally:
+        with solverStatsLock:
+            solverStats.Merge(s.stats)
+    solutionCache.Put(strInput, strOutput)
+    if strCanonical is not None:
+        solutionCache.Put(strCanonical, ApplyTransform(strOutput, transform) if strOutput else '')
+    return strOutput
+
+def SolveResult(strInput, deadline=None):
+    """
+    This function solves one puzzle of the JSON API.
+    Parameters:
+        deadline: time.perf_counter() of the request deadline. The solve is limited to the time left,
+                  and the puzzle is timed out without solving once it is passed. None for no deadline.
+    Returns:
+        Dictionary with puzzle, solution and solved flag, or error for input which is not valid
+    """
+    if not ClassicSudoku.IsValidInput(strInput):
+        return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Input not valid"}
+    timeLimit = None
+    if deadline is not None:
+        timeLimit = min(app.config['SOLVE_TIME_LIMIT'], deadline - time.perf_counter())
+        if timeLimit <= 0:
+            return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Timed out"}
+    try:
+        strOutput = SolveCached(strInput, timeLimit)
+    except SolveTimeout:
+        return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Timed out"}
+    except InvalidPuzzle as e:
+        return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': str(e)}
+    return {'puzzle': strInput, 'solution': strOutput or None, 'solved': bool(strOutput)}
 
 @app.route("/new")
 def NewSudoku():
     index = request.args.get('challenge', '')
+    level = request.args.get('level', '')
+    if index == '' and level:
+        if level not in levelNames:
+            return render_template('new_sudoku.html', strInput='',
+                                   error="Level must be one of %s" % ', '.join(levelNames)), 400
+        index = ChoosePuzzle(level)
+        if index is None:
+            return render_template('new_sudoku.html', strInput='', error="No %s puzzle yet" % level), 404
     if index == '':
-        index = random.randrange(0, len(puzzle))
-    strInput = puzzle[int(index)]
+        index = random.randrange(0, len(puzzleStore))
+    strInput = puzzleStore.GetPuzzle(int(index))
     return render_template('new_sudoku.html', strInput=strInput )
 
 @app.route("/add")
 def AddSudoku():
     return render_template("add_sudoku.html")
 
+def GetPage():
+    """
+    This function reads offset and limit of the page from query string, and bounds them.
+    Returns:
+        Tuple of (offset ; limit ; total number of puzzles)
+    """
+    total = len(puzzleStore)
+    offset = min(max(request.args.get('offset', 0, type=int), 0), total)
+    limit = request.args.get('limit', app.config['DISPLAY_PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), app.config['DISPLAY_PAGE_SIZE_MAX'])
+    return offset, limit, total
+
 @app.route("/display_all")
 def DisplayAllSudoku():
-    return render_template("display_all_sudoku.html", puzzle = puzzle)
+    """
+    One page of the puzzle store, from offset up to offset + limit.
+    With ?format=json the page is returned as JSON, with offset of the next page.
+    With ?format=packed the puzzles of the page are returned in packed binary format, see packed.py.
+    """
+    offset, limit, total = GetPage()
+    stop = min(offset + limit, total)
+    nextOffset = stop if stop < total else None
+    if request.args.get('format') == 'json':
+        listRecord = []
+        for index in range(offset, stop):
+            strInput, strAnswer, grade = puzzleStore.Get(index)
+            listRecord.append({'index': index, 'puzzle': strInput,
+                               'level': gradeLevels[grade] if grade is not None else None})
+        return jsonify(offset=offset, limit=limit, total=total, next=nextOffset, puzzles=listRecord)
+    if request.args.get('format') == 'packed':
+        fileOutput = io.BytesIO()
+        with PackedWriter(fileOutput) as writer:
+            writer.WriteMany(puzzleStore.Puzzles(offset, stop))
+        return Response(fileOutput.getvalue(), mimetype='application/octet-stream')
+    template = app.jinja_env.get_template("display_all_sudoku.html")
+    stream = template.stream(puzzle=puzzleStore.Puzzles(offset, stop), offset=offset, limit=limit, total=total,
+                             previous=max(offset - limit, 0) if offset else None, next=nextOffset)
+    return Response(stream_with_context(stream))
 
 @app.route("/submit")
 def SubmitSudoku():
     strInput = request.args.get('challenge', '')
-    puzzle.append(strInput)
-    size = len(puzzle)
-    index = size - 1
+    if not ClassicSudoku.IsValidInput(strInput):
+        return render_template('submit_sudoku.html', error="Input not valid"), 400
+    # One solve gives the solution and the grade.
+    # The techniques find contradiction of most puzzles without solution, before the search
+    s = ClassicSudoku()
+    s.tracer = tracer = GradeTracer()
+    try:
+        s.Load(strInput)
+        s.Solve(app.config['SOLVE_TIME_LIMIT'])
+        if tracer.grade == techniqueGrades['SolveBySearch']:
+            # The techniques keep every solution, so only a puzzle which needed search can have more than one
+            counter = ClassicSudoku()
+            counter.Load(strInput)
+            counter.deadline = s.deadline
+            if counter.CountSolutions(2) > 1:
+                return render_template('submit_sudoku.html', error="This Sudoku puzzle has more than one solution"), 400
+    except SolveTimeout:
+        return render_template('submit_sudoku.html', error="Timed out"), 503
+    except Contradiction:
+        return render_template('submit_sudoku.html', error="This Sudoku puzzle has no solution"), 400
+    except InvalidPuzzle as e:
+        return render_template('submit_sudoku.html', error=str(e)), 400
+    index = puzzleStore.Append(strInput, s.strOutput, tracer.grade)
     return render_template('submit_sudoku.html', index=str(index))
 
 @app.route("/")
@@ -88,20 +249,105 @@ def Index():
 @app.route("/solve")
 def SolveSudoku():
     strInput = request.args.get('challenge', '')
-    s = ClassicSudoku()
-    s.Load(strInput)
-    s.Solve()
-    print(s.strOutput)
+    try:
+        strOutput = SolveCached(strInput)
+    except SolveTimeout:
+        return render_template('solve_sudoku.html', render={'ip' : strInput, 'op' : ''}), 503
+    except InvalidPuzzle as e:
+        return render_template('solve_sudoku.html', render={'ip' : '', 'op' : ''}, error=str(e)), 400
     render = {
-        'ip' : s.strInput,
-        'op' : s.strOutput,
+        'ip' : strInput,
+        'op' : strOutput,
     }
     return render_template('solve_sudoku.html', render=render)
 
+@app.route("/api/solve", methods=['POST'])
+def ApiSolve():
+    """
+    JSON solve API. Request body is {"puzzles": [puzzle, ...]} or {"puzzle": puzzle}.
+    Response is {"results": [{"puzzle", "solution", "solved"}, ...]} in the order of the puzzles.
+    With ?stream=1, or Accept: application/x-ndjson, one JSON line is sent per puzzle as soon as it is solved.
+    The request has a deadline of REQUEST_TIMEOUT seconds, the puzzles left after it are returned as timed out.
+    """
+    body = request.get_json(silent=True)
+    if isinstance(body, dict) and 'puzzle' in body:
+        listInput = [body['puzzle']]
+    elif isinstance(body, dict) and isinstance(body.get('puzzles'), list):
+        listInput = body['puzzles']
+    else:
+        return jsonify(error="Request body must be JSON object with puzzles list"), 400
+    if len(listInput) > app.config['API_SOLVE_MAX']:
+        return jsonify(error="At most %d puzzles per request" % app.config['API_SOLVE_MAX']), 413
+
+    deadline = time.perf_counter() + app.config['REQUEST_TIMEOUT']
+    if request.args.get('stream') == '1' or request.accept_mimetypes.best == 'application/x-ndjson':
+        def Stream():
+            for strInput in listInput:
+                yield json.dumps(SolveResult(strInput, deadline)) + '\n'
+        return Response(stream_with_context(Stream()), mimetype='application/x-ndjson')
+    return jsonify(results=[SolveResult(strInput, deadline) for strInput in listInput])
+
+@app.route("/api/hint", methods=['POST'])
+def ApiHint():
+    """
+    Next hint of a puzzle in progress. Request body is {"puzzle": puzzle} to start, or {"state": state}
+    of the previous response to continue. One deduction is applied, see ClassicSudoku.Step.
+    Response is {"technique", "placed": [{"cell", "row", "col", "digit"}], "eliminated": [{"cell", "row", "col", "digits"}],
+    "board", "solved", "state"}. The client keeps the state for the next hint, so nothing is solved again.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('state', body.get('puzzle')), str):
+        return jsonify(error="Request body must be JSON object with puzzle or state"), 400
+    if 'state' in body:
+        try:
+            s = ClassicSudoku.Deserialize(body['state'])
+        except SudokuError as e:
+            return jsonify(error=str(e)), 400
+    else:
+        s = ClassicSudoku()
+        try:
+            s.Load(body['puzzle'])
+        except InvalidPuzzle as e:
+            return jsonify(error=str(e)), 400
+    s.schedule = GetSchedule()
+    try:
+        step = s.Step(app.config['SOLVE_TIME_LIMIT'])
+    except SolveTimeout:
+        return jsonify(error="Timed out"), 503
+    except Contradiction:
+        return jsonify(error="This Sudoku puzzle has no solution"), 400
+    solved = s.GetSolvedCount() == s.cellCount
+
+    def Cell(cellIndex):
+        return {'cell': cellIndex, 'row': s.cellRow[cellIndex], 'col': s.cellCol[cellIndex]}
+    return jsonify(technique=step['technique'] if step else None,
+                   placed=[dict(Cell(cellIndex), digit=digit) for cellIndex, digit in step['placed']] if step else [],
+                   eliminated=[dict(Cell(cellIndex), digits=digits) for cellIndex, digits in step['eliminated']] if step else [],
+                   board=s.output.decode('ascii'), solved=solved, state=s.Serialize())
+
+@app.route("/cache_stats")
+def CacheStats():
+    return jsonify(solutionCache.Stats())
+
+@app.route("/metrics")
+def Metrics():
+    with solverStatsLock:
+        text = solverStats.ToPrometheus()
+    lines = []
+    for key, value in sorted(solutionCache.Stats().items()):
+        if key in ('size', 'maxsize'):
+            lines.append('# TYPE sudoku_cache_%s gauge' % key)
+            lines.append('sudoku_cache_%s %d' % (key, value))
+        else:
+            lines.append('# TYPE sudoku_cache_%s_total counter' % key)
+            lines.append('sudoku_cache_%s_total %d' % (key, value))
+    text = text + '\n'.join(lines) + '\n'
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
 @app.route("/test_all")
 def TestAllSudoku():
     count = 0
-    for i in range(len(puzzle)):
+    for i in range(len(answer)):
         s = ClassicSudoku()
         s.Load(puzzle[i])
         s.Solve()
@@ -111,7 +357,7 @@ def TestAllSudoku():
             print(s.strOutput)
         del s
     str = "{} out of {} test cases are passed"
-    return str.format(count, len(puzzle))
+    return str.format(count, len(answer))
 
 if __name__ == '__main__':
     app.run()
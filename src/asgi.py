@@ -0,0 +1,242 @@
+"""
+Asynchronous serving mode of the solver, as a plain ASGI application (no framework needed).
+
+The event loop only parses requests and writes responses. Every solve runs in a bounded
+process pool, so a slow puzzle never stalls other requests:
+    backpressure : one solve runs per worker process. At most maxPending puzzles wait for a free worker,
+                   further puzzles are answered at once with error "Server busy"
+    deadline     : every request has a deadline. The solver itself stops at its time limit
+                   (ClassicSudoku.Solve raises SolveTimeout), so the worker process is freed as well
+Run it with any ASGI server, e.g.
+    uvicorn asgi:application --app-dir src
+
+Routes:
+    POST /api/solve   same request and response as /api/solve of app.py, ?stream=1 for NDJSON
+    GET  /solve       ?challenge=<puzzle>, JSON result of one puzzle
+    GET  /metrics     solver counters in Prometheus text format
+"""
+import asyncio
+import collections
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs
+
+from sudoku import ClassicSudoku, SolverStats, SolveTimeout, InvalidPuzzle, Contradiction
+from cache import SolutionCache
+
+
+def SolveInWorker(strInput, timeLimit):
+    """
+    This function is executed in worker process.
+    Returns:
+        Tuple of (solution string, '' if there is no solution, None if timed out ; SolverStats of the solve)
+    Raises:
+        InvalidPuzzle, if the puzzle is not valid
+    """
+    s = ClassicSudoku()
+    s.stats = SolverStats()
+    try:
+        s.Load(strInput)
+        s.Solve(timeLimit)
+    except SolveTimeout:
+        return None, s.stats
+    except Contradiction:
+        return '', s.stats
+    return s.strOutput, s.stats
+
+
+class SudokuApplication:
+    """
+    ASGI application. See module documentation.
+    """
+
+    def __init__(self, workers=None, maxPending=None, timeLimit=2.0, requestTimeout=10.0,
+                 maxPuzzles=1000, maxBodySize=1 << 20, cacheSize=1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.maxPending = maxPending or 4 * self.workers
+        self.timeLimit = timeLimit
+        self.requestTimeout = requestTimeout
+        self.maxPuzzles = maxPuzzles
+        self.maxBodySize = maxBodySize
+        self.solutionCache = SolutionCache(cacheSize)
+        self.solverStats = SolverStats()
+        self.executor = None
+        self.semaphore = None
+        # Number of puzzles waiting for a free worker
+        self.pending = 0
+
+    def Start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.semaphore = asyncio.Semaphore(self.workers)
+
+    def Stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def Solve(self, strInput, deadline):
+        """
+        This function solves one puzzle in the process pool, within the deadline of the request.
+        Parameters:
+            strInput: puzzle string
+            deadline: event loop time, after which the result is timed out
+        Returns:
+            Dictionary with puzzle, solution and solved flag, or error
+        """
+        if not ClassicSudoku.IsValidInput(strInput):
+            return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Input not valid"}
+        strOutput = self.solutionCache.Get(strInput)
+        if strOutput is None:
+            loop = asyncio.get_running_loop()
+            if self.semaphore.locked():
+                # All workers are busy: the puzzle waits, if there is a free pending slot
+                if self.pending >= self.maxPending:
+                    return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Server busy"}
+                self.pending += 1
+                try:
+                    await asyncio.wait_for(self.semaphore.acquire(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Timed out"}
+                finally:
+                    self.pending -= 1
+            else:
+                await self.semaphore.acquire()
+            try:
+                timeLimit = min(self.timeLimit, max(deadline - loop.time(), 0))
+                strOutput, stats = await loop.run_in_executor(self.executor, SolveInWorker, strInput, timeLimit)
+            except InvalidPuzzle as e:
+                return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': str(e)}
+            finally:
+                self.semaphore.release()
+            self.solverStats.Merge(stats)
+            if strOutput is None:
+                return {'puzzle': strInput, 'solution': None, 'solved': False, 'error': "Timed out"}
+            self.solutionCache.Put(strInput, strOutput)
+        return {'puzzle': strInput, 'solution': strOutput or None, 'solved': bool(strOutput)}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.Lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        self.Start()
+        path = scope['path']
+        method = scope['method']
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        deadline = asyncio.get_running_loop().time() + self.requestTimeout
+
+        if path == '/api/solve' and method == 'POST':
+            await self.ApiSolve(scope, receive, send, query, deadline)
+        elif path == '/solve' and method == 'GET':
+            result = await self.Solve(query.get('challenge', [''])[0], deadline)
+            status = {None: 200, "Timed out": 504, "Server busy": 503}.get(result.get('error'), 400)
+            await self.SendJson(send, status, result)
+        elif path == '/metrics' and method == 'GET':
+            await self.Send(send, 200, self.solverStats.ToPrometheus().encode(), b'text/plain; version=0.0.4')
+        else:
+            await self.SendJson(send, 404, {'error': "Not found"})
+
+    async def ApiSolve(self, scope, receive, send, query, deadline):
+        """
+        POST /api/solve. The puzzles of one request are solved concurrently, see SolveMany.
+        """
+        body = await self.ReadBody(receive)
+        if body is None:
+            await self.SendJson(send, 413, {'error': "Request body too large"})
+            return
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = None
+        if isinstance(body, dict) and 'puzzle' in body:
+            listInput = [body['puzzle']]
+        elif isinstance(body, dict) and isinstance(body.get('puzzles'), list):
+            listInput = body['puzzles']
+        else:
+            await self.SendJson(send, 400, {'error': "Request body must be JSON object with puzzles list"})
+            return
+        if len(listInput) > self.maxPuzzles:
+            await self.SendJson(send, 413, {'error': "At most %d puzzles per request" % self.maxPuzzles})
+            return
+
+        accept = dict(scope['headers']).get(b'accept', b'')
+        listResult = self.SolveMany(listInput, deadline)
+        if query.get('stream') == ['1'] or accept == b'application/x-ndjson':
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'application/x-ndjson')]})
+            async for result in listResult:
+                line = json.dumps(result) + '\n'
+                await send({'type': 'http.response.body', 'body': line.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        else:
+            await self.SendJson(send, 200, {'results': [result async for result in listResult]})
+
+    async def SolveMany(self, listInput, deadline):
+        """
+        This function yields results of the puzzles in their order. At most one puzzle per worker
+        process is in flight for one request, so a bulk request does not take all pending slots.
+        """
+        window = collections.deque()
+        try:
+            for strInput in listInput:
+                window.append(asyncio.ensure_future(self.Solve(strInput, deadline)))
+                if len(window) >= self.workers:
+                    yield await window.popleft()
+            while window:
+                yield await window.popleft()
+        finally:
+            # Client went away: puzzles in flight are dropped
+            for task in window:
+                task.cancel()
+
+    async def ReadBody(self, receive):
+        """
+        This function reads request body. Returns None, if it is longer than maxBodySize.
+        """
+        listChunk = []
+        length = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            length += len(chunk)
+            if length > self.maxBodySize:
+                return None
+            listChunk.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(listChunk)
+
+    async def Lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.Start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.Stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def Send(send, status, body, contentType):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', contentType), (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def SendJson(self, send, status, value):
+        await self.Send(send, status, json.dumps(value).encode(), b'application/json')
+
+
+application = SudokuApplication(
+    workers=int(os.environ['SOLVE_WORKERS']) if 'SOLVE_WORKERS' in os.environ else None,
+    maxPending=int(os.environ['SOLVE_MAX_PENDING']) if 'SOLVE_MAX_PENDING' in os.environ else None,
+    timeLimit=float(os.environ.get('SOLVE_TIME_LIMIT', 2.0)),
+    requestTimeout=float(os.environ.get('REQUEST_TIMEOUT', 10.0)),
+    maxPuzzles=int(os.environ.get('API_SOLVE_MAX', 1000)),
+    cacheSize=int(os.environ.get('SOLUTION_CACHE_SIZE', 1024)),
+)
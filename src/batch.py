@@ -0,0 +1,94 @@
+"""
+Batch solving of Sudoku puzzles on all CPU cores.
+
+Command line usage:
+    python batch.py [FILE] [--workers N] [--chunksize N] [--vectorized] [--packed]
+
+Reads one 81 character puzzle per line from FILE (or stdin) and writes one
+solution per line to stdout, in input order. An empty line is written for a
+puzzle without solution.
+With --vectorized, every chunk is solved by the NumPy batch solver (vectorized.BatchSudoku).
+With --packed, FILE is read in packed binary format (see packed.py) instead of text.
+"""
+import argparse
+import collections
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from sudoku import ClassicSudoku, InvalidPuzzle
+from packed import PackedReader, OpenInput, ReadPuzzles
+
+
+def SolveChunk(listInput, vectorized=False):
+    """
+    This function is executed in worker process. It solves list of puzzles.
+    Parameters:
+        listInput: list of puzzle strings
+        vectorized: solve with the NumPy batch solver
+    Returns:
+        List of solution strings, '' for puzzle without solution
+    """
+    if vectorized:
+        from vectorized import BatchSudoku
+        return BatchSudoku().SolveBatch(listInput)
+    listOutput = []
+    for strInput in listInput:
+        s = ClassicSudoku()
+        try:
+            s.Load(strInput)
+            s.Solve()
+        except InvalidPuzzle:
+            s.strOutput = ''
+        listOutput.append(s.strOutput)
+    return listOutput
+
+
+def solve_many(puzzles, workers=None, chunksize=256, vectorized=False):
+    """
+    This function solves puzzles in a process pool and yields the solutions in input order.
+    The input is consumed lazily, so at most 2 chunks per worker are in flight at any time.
+    Parameters:
+        puzzles: iterable of puzzle strings
+        workers: number of worker processes, default is number of CPUs
+        chunksize: number of puzzles sent to worker process in one task
+        vectorized: solve with the NumPy batch solver, larger chunksize suits it better
+    Returns:
+        Generator of solution strings, '' for puzzle without solution
+    """
+    workers = workers or os.cpu_count() or 1
+    iterInput = iter(puzzles)
+    pending = collections.deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < 2 * workers:
+                listInput = list(itertools.islice(iterInput, chunksize))
+                if listInput:
+                    pending.append(executor.submit(SolveChunk, listInput, vectorized))
+                else:
+                    exhausted = True
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve newline delimited Sudoku puzzles on all CPU cores.")
+    parser.add_argument('file', nargs='?', help="input file, default is stdin")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--chunksize', type=int, default=256, help="puzzles per worker task")
+    parser.add_argument('--vectorized', action='store_true', help="use the NumPy batch solver")
+    parser.add_argument('--packed', action='store_true', help="input is in packed binary format")
+    args = parser.parse_args(argv)
+
+    with OpenInput(args.file, 'rb' if args.packed else 'r') as fileInput:
+        puzzles = PackedReader(fileInput) if args.packed else ReadPuzzles(fileInput)
+        for strOutput in solve_many(puzzles, args.workers, args.chunksize, args.vectorized):
+            sys.stdout.write(strOutput + '\n')
+
+
+if __name__ == '__main__':
+    Main()
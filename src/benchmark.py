@@ -0,0 +1,209 @@
+"""
+Offline benchmark of ClassicSudoku over the bundled puzzle corpus and generated puzzles.
+
+Command line usage:
+    python benchmark.py [--repeat N] [--generated N] [--seed N] [--sizes N ...] [--sized-count N]
+                        [--time-limit SECONDS] [--output FILE] [--compare FILE]
+
+For every corpus it reports throughput (puzzles per second), p50 / p99 latency per solve,
+peak memory allocated per solve and number of correctly solved puzzles.
+The results can be saved as JSON, and compared with results saved on another commit.
+With --sizes, generated puzzles of other sizes (e.g. 4 16 25) are solved with GenericSudoku.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from sudoku import ClassicSudoku, GenericSudoku, SolveTimeout
+from corpus import puzzle, puzzle_nonw, answer
+
+# Number of givens of generated puzzles, from easy to hard
+generatedLevels = (('generated_easy', 40), ('generated_medium', 32), ('generated_hard', 26))
+
+
+def GenerateGrid(rnd, sudokuClass=ClassicSudoku):
+    """
+    This function returns random complete grid, by shuffling rows, columns and digits of a pattern grid.
+    """
+    size = sudokuClass.size
+    sqrt_size = sudokuClass.sqrt_size
+
+    def Shuffled():
+        listBand = rnd.sample(range(sqrt_size), sqrt_size)
+        return [band * sqrt_size + line for band in listBand for line in rnd.sample(range(sqrt_size), sqrt_size)]
+
+    rows = Shuffled()
+    cols = Shuffled()
+    digits = rnd.sample(range(1, size + 1), size)
+    return ''.join(sudokuClass.symbols[digits[(sqrt_size * (r % sqrt_size) + r // sqrt_size + c) % size]]
+                   for r in rows for c in cols)
+
+
+def GeneratePuzzles(count, givens, rnd, sudokuClass=ClassicSudoku):
+    """
+    This function returns list of (puzzle, None) pairs, with given number of givens.
+    The givens are removed at random, so the puzzle may have more than one solution,
+    and any valid solution is accepted.
+    """
+    listPair = []
+    cellCount = sudokuClass.cellCount
+    for i in range(count):
+        listInput = list(GenerateGrid(rnd, sudokuClass))
+        for cellIndex in rnd.sample(range(cellCount), cellCount - givens):
+            listInput[cellIndex] = '0'
+        listPair.append((''.join(listInput), None))
+    return listPair
+
+
+def IsSolution(strInput, strOutput, sudokuClass=ClassicSudoku):
+    """
+    This function checks that strOutput is complete valid grid, which keeps all givens of strInput.
+    """
+    if len(strOutput) != sudokuClass.cellCount:
+        return False
+    if any(ch != '0' and ch != out for ch, out in zip(strInput, strOutput)):
+        return False
+    digits = set(sudokuClass.symbols[1:])
+    for listCellIndex in sudokuClass.unitCells:
+        if {strOutput[cellIndex] for cellIndex in listCellIndex} != digits:
+            return False
+    return True
+
+
+def Percentile(listValue, percent):
+    listValue = sorted(listValue)
+    index = min(len(listValue) - 1, int(round(percent / 100.0 * (len(listValue) - 1))))
+    return listValue[index]
+
+
+def RunCorpus(listPair, repeat, sudokuClass=ClassicSudoku, timeLimit=None):
+    """
+    This function solves every puzzle of the corpus repeat times and measures it.
+    Parameters:
+        listPair: list of (puzzle, answer), answer is None when it is not known
+        repeat: number of times the corpus is solved
+        sudokuClass: solver class, ClassicSudoku or subclass of GenericSudoku
+        timeLimit: seconds per solve, the puzzle is counted as timed out after it
+    Returns:
+        Dictionary of results
+    """
+    listLatency = []
+    solved = 0
+    timeouts = 0
+    start = time.perf_counter()
+    for i in range(repeat):
+        for strInput, strAnswer in listPair:
+            t = time.perf_counter()
+            s = sudokuClass()
+            s.Load(strInput)
+            try:
+                s.Solve(timeLimit)
+            except SolveTimeout:
+                timeouts += (i == 0)
+            listLatency.append(time.perf_counter() - t)
+            if i == 0:
+                solved += (s.strOutput == strAnswer) if strAnswer else IsSolution(strInput, s.strOutput, sudokuClass)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a separate pass, as tracemalloc slows down the solver
+    listPeak = []
+    tracemalloc.start()
+    for strInput, strAnswer in listPair:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        s = sudokuClass()
+        s.Load(strInput)
+        try:
+            s.Solve(timeLimit)
+        except SolveTimeout:
+            pass
+        listPeak.append(tracemalloc.get_traced_memory()[1] - base)
+        del s
+    tracemalloc.stop()
+
+    return {
+        'puzzles': len(listPair),
+        'solved': solved,
+        'timeouts': timeouts,
+        'solves': len(listLatency),
+        'puzzles_per_sec': len(listLatency) / elapsed if elapsed else 0.0,
+        'p50_ms': Percentile(listLatency, 50) * 1000,
+        'p99_ms': Percentile(listLatency, 99) * 1000,
+        'mean_peak_bytes': sum(listPeak) / len(listPeak),
+        'max_peak_bytes': max(listPeak),
+    }
+
+
+def GitRevision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ClassicSudoku over the bundled and generated puzzles.")
+    parser.add_argument('--repeat', type=int, default=5, help="number of times each corpus is solved")
+    parser.add_argument('--generated', type=int, default=50, help="number of generated puzzles per level")
+    parser.add_argument('--seed', type=int, default=2019, help="random seed of generated puzzles")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[],
+                        help="also solve generated puzzles of these sizes with GenericSudoku, e.g. 4 16 25")
+    parser.add_argument('--sized-count', type=int, default=10, help="number of generated puzzles per level of --sizes")
+    parser.add_argument('--time-limit', type=float, default=None, help="seconds per solve, default no limit")
+    parser.add_argument('--output', help="save results as JSON file")
+    parser.add_argument('--compare', help="JSON file of earlier results, to print the change")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    corpora = [
+        ('puzzle', list(zip(puzzle, answer)), ClassicSudoku),
+        ('puzzle_nonw', [(strInput, None) for strInput in puzzle_nonw], ClassicSudoku),
+    ]
+    for name, givens in generatedLevels:
+        corpora.append((name, GeneratePuzzles(args.generated, givens, rnd), ClassicSudoku))
+    for size in args.sizes:
+        sudokuClass = GenericSudoku.ForSize(size)
+        for name, givens in generatedLevels:
+            # Same share of givens as 9 x 9 puzzles of the level
+            givens = round(givens * sudokuClass.cellCount / ClassicSudoku.cellCount)
+            name = name.replace('generated_', 'generated_%dx%d_' % (size, size))
+            corpora.append((name, GeneratePuzzles(args.sized_count, givens, rnd, sudokuClass), sudokuClass))
+
+    results = {
+        'revision': GitRevision(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'time_limit': args.time_limit,
+        'corpora': {},
+    }
+    for name, listPair, sudokuClass in corpora:
+        results['corpora'][name] = RunCorpus(listPair, args.repeat, sudokuClass, args.time_limit)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fileInput:
+            baseline = json.load(fileInput)['corpora']
+
+    print("%-24s %8s %12s %10s %10s %12s" % ('corpus', 'solved', 'puzzles/sec', 'p50 ms', 'p99 ms', 'peak bytes'))
+    for name, result in results['corpora'].items():
+        line = "%-24s %4d/%-3d %12.1f %10.3f %10.3f %12d" % (
+            name, result['solved'], result['puzzles'], result['puzzles_per_sec'],
+            result['p50_ms'], result['p99_ms'], result['mean_peak_bytes'])
+        if baseline and name in baseline and baseline[name]['puzzles_per_sec']:
+            line += "  %+.1f%% throughput" % (
+                100.0 * (result['puzzles_per_sec'] / baseline[name]['puzzles_per_sec'] - 1))
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as fileOutput:
+            json.dump(results, fileOutput, indent=2)
+
+
+if __name__ == '__main__':
+    Main()
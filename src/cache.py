@@ -0,0 +1,85 @@
+"""
+Bounded LRU cache for Sudoku solutions.
+"""
+import collections
+import threading
+import time
+
+
+class SolutionCache:
+    """
+    Least recently used cache with optional time to live.
+    It maps puzzle string to solution string and counts hits, misses and evictions.
+    It is safe to share between request threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        """
+        Parameters:
+            maxsize: maximum number of entries, least recently used entry is evicted beyond it
+            ttl: seconds after which an entry expires, None for no expiry
+            timer: clock used for ttl
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def Get(self, key):
+        """
+        This function returns cached value for key, or None on miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expiry = entry
+            if expiry is not None and expiry <= self.timer():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def Put(self, key, value):
+        """
+        This function stores value for key, and evicts least recently used entries beyond maxsize.
+        """
+        if self.maxsize <= 0:
+            return
+        expiry = None if self.ttl is None else self.timer() + self.ttl
+        with self.lock:
+            self.entries[key] = (value, expiry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def Clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def Stats(self):
+        """
+        This function returns dictionary of counters.
+        """
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self):
+        return len(self.entries)
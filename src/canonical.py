@@ -0,0 +1,198 @@
+"""
+Canonical form of 9 x 9 Sudoku puzzles under the validity preserving transformations:
+    digit relabeling,
+    row permutation within band, column permutation within stack,
+    band permutation, stack permutation,
+    transpose.
+
+The canonical form is the lexicographically smallest string among all equivalent puzzles
+(minlex). Equivalent puzzles have same canonical form, so it can be used as cache key
+and for removing duplicates from a collection of puzzles.
+
+A transform is a tuple (transpose, rowOrder, colOrder, digitMap) with meaning
+    canonical[r * 9 + c] = digitMap[grid[rowOrder[r] * 9 + colOrder[c]]]
+where grid is the input, transposed first if transpose is True.
+
+Sparse puzzles have many equivalent transformations with the same prefix, so the search is bounded:
+puzzles with fewer than minClues givens, and puzzles with more than maxStates tied candidates,
+are not canonicalized and keep their own string with identity transform.
+"""
+size = 9
+sqrt_size = 3
+# A puzzle with unique solution has at least 17 givens
+minClues = 17
+maxStates = 4096
+identity = (False, tuple(range(size)), tuple(range(size)), tuple(range(size + 1)))
+
+
+def AllowedLines(listLine):
+    """
+    This function is a helper function. It returns lines which can be placed at next position,
+    given the lines already placed. Line = Row | Column
+    A new band (stack) can start at every third position, else the line comes from current band (stack).
+    """
+    position = len(listLine)
+    if position % sqrt_size == 0:
+        usedBands = {line // sqrt_size for line in listLine}
+        return [line for line in range(size) if line // sqrt_size not in usedBands]
+    band = listLine[-1] // sqrt_size
+    return [line for line in range(band * sqrt_size, (band + 1) * sqrt_size) if line not in listLine]
+
+
+def Relabel(values, labels, nextLabel):
+    """
+    This function is a helper function. It relabels digits in order of first appearance.
+    Parameters:
+        values: digits, 0 for empty cell
+        labels: tuple, current digit -> label map
+        nextLabel: next unused label
+    Returns:
+        Tuple of (relabeled values ; updated labels ; updated nextLabel)
+    """
+    listLabel = None
+    result = []
+    for digit in values:
+        if digit:
+            label = labels[digit] if listLabel is None else listLabel[digit]
+            if label == 0:
+                if listLabel is None:
+                    listLabel = list(labels)
+                label = listLabel[digit] = nextLabel
+                nextLabel += 1
+            result.append(label)
+        else:
+            result.append(0)
+    return tuple(result), (labels if listLabel is None else tuple(listLabel)), nextLabel
+
+
+def Canonicalize(strInput):
+    """
+    This function computes canonical form of the puzzle.
+    Equivalent puzzles are built row by row, and at each row only the candidates with smallest
+    prefix are kept. So only a small part of the 2 * 6^8 * 9! transformations is evaluated.
+    Parameters:
+        strInput: puzzle as 81 character string, '0' for empty cell
+    Returns:
+        Tuple of (canonical puzzle string ; transform from strInput to canonical string)
+        Puzzle with fewer than minClues givens, or more than maxStates tied candidates,
+        gives (strInput ; identity)
+    """
+    grid = [int(ch) for ch in strInput]
+    if size * size - grid.count(0) < minClues:
+        return strInput, identity
+    grids = (
+        [grid[r * size:(r + 1) * size] for r in range(size)],
+        [grid[c::size] for c in range(size)],
+    )
+    emptyLabels = (0,) * (size + 1)
+
+    # First row: choose transpose, first row and complete column order
+    best = None
+    states = []
+    for transpose in (False, True):
+        rows = grids[transpose]
+        for rowIndex in range(size):
+            row = rows[rowIndex]
+            partial = [((), emptyLabels, 1, ())]
+            for position in range(size):
+                partialBest = None
+                nextPartial = []
+                for colOrder, labels, nextLabel, values in partial:
+                    for colIndex in AllowedLines(colOrder):
+                        value, newLabels, newNext = Relabel((row[colIndex],), labels, nextLabel)
+                        candidate = values + value
+                        if partialBest is None or candidate < partialBest:
+                            partialBest = candidate
+                            nextPartial = []
+                        if candidate == partialBest:
+                            nextPartial.append((colOrder + (colIndex,), newLabels, newNext, candidate))
+                partial = nextPartial
+                if len(partial) > maxStates:
+                    return strInput, identity
+                if best is not None and partialBest > best[:len(partialBest)]:
+                    partial = []
+                    break
+            if not partial:
+                continue
+            candidate = partial[0][3]
+            if best is None or candidate < best:
+                best = candidate
+                states = []
+            for colOrder, labels, nextLabel, values in partial:
+                states.append((transpose, (rowIndex,), colOrder, labels, nextLabel))
+            if len(states) > maxStates:
+                return strInput, identity
+
+    result = list(best)
+
+    # Other rows: choose next row, the column order is already fixed
+    for position in range(1, size):
+        best = None
+        nextStates = []
+        for transpose, rowOrder, colOrder, labels, nextLabel in states:
+            rows = grids[transpose]
+            for rowIndex in AllowedLines(rowOrder):
+                row = rows[rowIndex]
+                candidate, newLabels, newNext = Relabel([row[c] for c in colOrder], labels, nextLabel)
+                if best is None or candidate < best:
+                    best = candidate
+                    nextStates = []
+                if candidate == best:
+                    nextStates.append((transpose, rowOrder + (rowIndex,), colOrder, newLabels, newNext))
+        states = nextStates
+        if len(states) > maxStates:
+            return strInput, identity
+        result.extend(best)
+
+    transpose, rowOrder, colOrder, labels, nextLabel = states[0]
+    # Digits absent in puzzle get remaining labels, so that digitMap is a complete relabeling
+    digitMap = list(labels)
+    for digit in range(1, size + 1):
+        if digitMap[digit] == 0:
+            digitMap[digit] = nextLabel
+            nextLabel += 1
+
+    return ''.join(map(str, result)), (transpose, rowOrder, colOrder, tuple(digitMap))
+
+
+def ApplyTransform(strGrid, transform):
+    """
+    This function applies transform returned by Canonicalize, to any grid of same puzzle,
+    e.g. to its solution.
+    """
+    transpose, rowOrder, colOrder, digitMap = transform
+    listOutput = []
+    for r in rowOrder:
+        for c in colOrder:
+            cellIndex = c * size + r if transpose else r * size + c
+            listOutput.append(str(digitMap[int(strGrid[cellIndex])]))
+    return ''.join(listOutput)
+
+
+def InvertTransform(strGrid, transform):
+    """
+    This function maps a canonical grid, e.g. cached solution of canonical puzzle,
+    back to the original orientation and digits.
+    """
+    transpose, rowOrder, colOrder, digitMap = transform
+    inverseMap = [0] * (size + 1)
+    for digit, label in enumerate(digitMap):
+        inverseMap[label] = digit
+    listOutput = ['0'] * (size * size)
+    for r, rowIndex in enumerate(rowOrder):
+        for c, colIndex in enumerate(colOrder):
+            cellIndex = colIndex * size + rowIndex if transpose else rowIndex * size + colIndex
+            listOutput[cellIndex] = str(inverseMap[int(strGrid[r * size + c])])
+    return ''.join(listOutput)
+
+
+def Dedupe(puzzles):
+    """
+    This function yields puzzles, skipping the ones equivalent to an earlier puzzle.
+    """
+    seen = set()
+    for strInput in puzzles:
+        strCanonical, transform = Canonicalize(strInput)
+        if strCanonical not in seen:
+            seen.add(strCanonical)
+            yield strInput
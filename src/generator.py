@@ -0,0 +1,172 @@
+"""
+Generator of Sudoku puzzles with unique solution, graded by the technique ladder of ClassicSudoku.
+
+Command line usage:
+    python generator.py [--count N] [--workers N] [--seed N] [--output FILE]
+
+Writes one line per puzzle: puzzle, answer and grade separated by space.
+"""
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from sudoku import ClassicSudoku
+
+# Grade = the highest function of FSM needed to solve the puzzle
+techniqueGrades = {
+    'SolveSingleCandidate': 0,
+    'SolveExplicitRegion': 1,
+    'SolveImplicitRegion': 2,
+    'SolveCandidateLineTechnique': 3,
+    'SolveMultipleLinesTechnique': 4,
+    'SolveXWingTechnique': 5,
+    'SolveSwordfishTechnique': 6,
+    'SolveXYWingTechnique': 7,
+    'SolveSimpleColoringTechnique': 8,
+    'SolveBySearch': 9,
+}
+gradeLevels = ('easy', 'medium', 'medium', 'hard', 'hard', 'expert', 'expert', 'expert', 'expert', 'master')
+levelNames = ('easy', 'medium', 'hard', 'expert', 'master')
+
+
+class GradeTracer:
+    """
+    Tracer of ClassicSudoku, which keeps the highest function of FSM which made progress. Usage:
+        s.tracer = tracer = GradeTracer()
+        s.Solve()
+        tracer.grade
+    """
+
+    def __init__(self):
+        self.grade = 0
+
+    def __call__(self, technique, status, eliminated, placed):
+        if eliminated or placed:
+            self.grade = max(self.grade, techniqueGrades.get(technique, 0))
+
+
+def Grade(strInput):
+    """
+    This function solves the puzzle and returns the highest function of FSM which made progress.
+    Parameters:
+        strInput: puzzle string
+    Returns:
+        Grade 0 to 9, see techniqueGrades
+    """
+    s = ClassicSudoku()
+    s.tracer = tracer = GradeTracer()
+    s.Load(strInput)
+    s.Solve()
+    return tracer.grade
+
+
+def FillGrid(rnd):
+    """
+    This function returns random complete grid.
+    The three diagonal blocks do not share any region, so they are filled with random permutations,
+    and the search completes the rest of the grid.
+    """
+    size = ClassicSudoku.size
+    listCell = ['0'] * ClassicSudoku.cellCount
+    for blockIndex in range(0, size, ClassicSudoku.sqrt_size + 1):
+        digits = rnd.sample('123456789', size)
+        for cellIndex, digit in zip(ClassicSudoku.blockCells[blockIndex], digits):
+            listCell[cellIndex] = digit
+    s = ClassicSudoku()
+    s.Load(''.join(listCell))
+    count, output = s.SearchSolutions(1)
+    return output.decode('ascii')
+
+
+def HasUniqueSolution(strInput):
+    s = ClassicSudoku()
+    s.Load(strInput)
+    return s.CountSolutions(limit=2) == 1
+
+
+def GeneratePuzzle(rnd, symmetric=True):
+    """
+    This function fills a random grid, and removes givens in random order while the solution stays unique.
+    Parameters:
+        rnd: random.Random object
+        symmetric: remove givens in pairs, symmetric about the center
+    Returns:
+        Tuple of (puzzle ; answer ; grade)
+    """
+    strAnswer = FillGrid(rnd)
+    listCell = list(strAnswer)
+    cellCount = ClassicSudoku.cellCount
+    listCellIndex = list(range(cellCount // 2 + 1 if symmetric else cellCount))
+    rnd.shuffle(listCellIndex)
+    for cellIndex in listCellIndex:
+        listPair = {cellIndex, cellCount - 1 - cellIndex} if symmetric else {cellIndex}
+        saved = [(i, listCell[i]) for i in listPair]
+        for i in listPair:
+            listCell[i] = '0'
+        if not HasUniqueSolution(''.join(listCell)):
+            for i, digit in saved:
+                listCell[i] = digit
+    strInput = ''.join(listCell)
+    return strInput, strAnswer, Grade(strInput)
+
+
+def GenerateChunk(seed, count):
+    """
+    This function is executed in worker process. It generates count puzzles from the seed.
+    """
+    rnd = random.Random(seed)
+    return [GeneratePuzzle(rnd) for i in range(count)]
+
+
+def GeneratePool(count, workers=None, seed=None, chunksize=8):
+    """
+    This function generates graded puzzles in a process pool.
+    Parameters:
+        count: number of puzzles
+        workers: number of worker processes, default is number of CPUs
+        seed: random seed, for reproducible pool
+        chunksize: number of puzzles generated in one task
+    Returns:
+        Generator of (puzzle ; answer ; grade)
+    """
+    rnd = random.Random(seed)
+    listTask = []
+    while count > 0:
+        listTask.append((rnd.getrandbits(64), min(chunksize, count)))
+        count -= chunksize
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for listPuzzle in executor.map(GenerateChunk, *zip(*listTask)):
+            yield from listPuzzle
+
+
+def ReadPool(fileInput):
+    """
+    This function reads pool written by this module. It yields (puzzle ; answer ; grade).
+    """
+    for line in fileInput:
+        fields = line.split()
+        if len(fields) == 3:
+            yield fields[0], fields[1], int(fields[2])
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate graded Sudoku puzzles with unique solution.")
+    parser.add_argument('--count', type=int, default=100, help="number of puzzles")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--output', help="output file, default is stdout")
+    args = parser.parse_args(argv)
+
+    fileOutput = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for strInput, strAnswer, grade in GeneratePool(args.count, args.workers, args.seed):
+            fileOutput.write('%s %s %d\n' % (strInput, strAnswer, grade))
+    finally:
+        if fileOutput is not sys.stdout:
+            fileOutput.close()
+
+
+if __name__ == '__main__':
+    Main()
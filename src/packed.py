@@ -0,0 +1,234 @@
+"""
+Packed binary format of 9 x 9 puzzles, with 4 bits per cell.
+
+A puzzle string is read as hexadecimal number, so bytes.fromhex packs it and bytes.hex unpacks it,
+both in C, for a whole chunk of puzzles at once:
+    header : 8 bytes magic, 4 bytes cell count, 4 bytes reserved
+    record : 41 bytes, cell 0 in high 4 bits of first byte, ..., last 4 bits are 0
+A record is half the size of a text line, and record i is at fixed offset, like records of store.PuzzleStore.
+
+Command line usage:
+    python packed.py pack [INPUT] [OUTPUT]             text (one puzzle per line) -> packed
+    python packed.py unpack [INPUT] [OUTPUT]           packed -> text
+    python packed.py import INPUT [--store FILE]       packed -> puzzle store, without answer and grade
+    python packed.py export OUTPUT [--store FILE]      puzzle store -> packed
+INPUT and OUTPUT default to stdin and stdout.
+"""
+import argparse
+import contextlib
+import itertools
+import os
+import struct
+import sys
+
+from sudoku import ClassicSudoku, InvalidPuzzle
+from store import PuzzleStore
+
+magic = b'DIGIPAK1'
+header = struct.Struct('<8sII')
+cellCount = ClassicSudoku.cellCount
+recordSize = (cellCount + 1) // 2
+# Puzzle string is padded to even number of cells
+padding = '0' * (2 * recordSize - cellCount)
+
+
+def CheckPuzzles(listInput, strData=None):
+    """
+    This function checks symbols and length of all puzzles of a chunk at once.
+    Parameters:
+        listInput: list of puzzle strings
+        strData: the puzzle strings joined, if already at hand
+    Raises:
+        InvalidPuzzle, if a puzzle has wrong length or symbol
+    """
+    if strData is None:
+        strData = ''.join(listInput)
+    # ASCII decimal digits are exactly '0' to '9'
+    if not (strData.isascii() and strData.isdigit()) or set(map(len, listInput)) - {cellCount}:
+        for strInput in listInput:
+            if not ClassicSudoku.IsValidInput(strInput):
+                raise InvalidPuzzle("Puzzle not valid: %r" % strInput)
+
+
+def Pack(listInput):
+    """
+    This function packs list of puzzle strings.
+    Parameters:
+        listInput: list of puzzle strings, '0' for empty cell
+    Returns:
+        bytes, recordSize bytes per puzzle
+    Raises:
+        InvalidPuzzle, if a puzzle has wrong length or symbol
+    """
+    strData = padding.join(listInput) + padding
+    CheckPuzzles(listInput, strData)
+    return bytes.fromhex(strData)
+
+
+def Unpack(data):
+    """
+    This function unpacks puzzles packed by Pack.
+    Parameters:
+        data: bytes, multiple of recordSize
+    Returns:
+        List of puzzle strings
+    """
+    strData = data.hex()
+    step = 2 * recordSize
+    return [strData[i:i + cellCount] for i in range(0, len(strData), step)]
+
+
+class PackedWriter:
+    """
+    Streaming writer of packed file. Usage:
+        with PackedWriter(fileOutput) as writer:
+            writer.WriteMany(puzzles)
+    """
+
+    def __init__(self, fileOutput, chunksize=65536):
+        self.fileOutput = fileOutput
+        self.chunksize = chunksize
+        self.buffer = []
+        self.count = 0
+        self.fileOutput.write(header.pack(magic, cellCount, 0))
+
+    def Write(self, strInput):
+        self.buffer.append(strInput)
+        if len(self.buffer) >= self.chunksize:
+            self.Flush()
+
+    def WriteMany(self, puzzles):
+        """
+        This function writes iterable of puzzle strings, chunksize puzzles with one Pack.
+        """
+        iterInput = iter(puzzles)
+        self.Flush()
+        while True:
+            listInput = list(itertools.islice(iterInput, self.chunksize))
+            if not listInput:
+                break
+            self.fileOutput.write(Pack(listInput))
+            self.count += len(listInput)
+
+    def Flush(self):
+        if self.buffer:
+            self.fileOutput.write(Pack(self.buffer))
+            self.count += len(self.buffer)
+            self.buffer = []
+
+    def Close(self):
+        self.Flush()
+        self.fileOutput.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+class PackedReader:
+    """
+    Streaming reader of packed file. Iterating over it yields puzzle strings,
+    Chunks yields lists of puzzle strings, which is faster.
+    """
+
+    def __init__(self, fileInput, chunksize=65536):
+        self.fileInput = fileInput
+        self.chunksize = chunksize
+        data = fileInput.read(header.size)
+        if len(data) != header.size:
+            raise ValueError("packed file has no header")
+        fileMagic, fileCellCount, reserved = header.unpack(data)
+        if fileMagic != magic or fileCellCount != cellCount:
+            raise ValueError("not a packed file of %d cell puzzles" % cellCount)
+
+    def Chunks(self):
+        """
+        This function yields lists of at most chunksize puzzle strings.
+        Raises:
+            InvalidPuzzle, if a record has a cell other than 0 to 9
+        """
+        while True:
+            data = self.fileInput.read(self.chunksize * recordSize)
+            if not data:
+                return
+            if len(data) % recordSize:
+                raise ValueError("packed file ends with partial record")
+            listInput = Unpack(data)
+            CheckPuzzles(listInput)
+            yield listInput
+
+    def __iter__(self):
+        for listInput in self.Chunks():
+            yield from listInput
+
+
+def ReadPuzzles(fileInput):
+    """
+    This function yields puzzle strings from text file, one per line. Empty lines are skipped.
+    """
+    for line in fileInput:
+        strInput = line.strip()
+        if strInput:
+            yield strInput
+
+
+def OpenInput(path, mode):
+    if path and path != '-':
+        return open(path, mode)
+    return contextlib.nullcontext(sys.stdin.buffer if 'b' in mode else sys.stdin)
+
+
+def OpenOutput(path, mode):
+    if path and path != '-':
+        return open(path, mode)
+    return contextlib.nullcontext(sys.stdout.buffer if 'b' in mode else sys.stdout)
+
+
+def Main(argv=None):
+    defaultStore = os.environ.get('PUZZLE_STORE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles.dat'))
+    parser = argparse.ArgumentParser(description="Convert Sudoku puzzles between text and packed binary format.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, helpText in (('pack', "text to packed"), ('unpack', "packed to text")):
+        subparser = subparsers.add_parser(command, help=helpText)
+        subparser.add_argument('input', nargs='?', help="input file, default is stdin")
+        subparser.add_argument('output', nargs='?', help="output file, default is stdout")
+    subparser = subparsers.add_parser('import', help="packed to puzzle store")
+    subparser.add_argument('input', help="packed file, - for stdin")
+    subparser.add_argument('--store', default=defaultStore, help="puzzle store file")
+    subparser = subparsers.add_parser('export', help="puzzle store to packed")
+    subparser.add_argument('output', help="packed file, - for stdout")
+    subparser.add_argument('--store', default=defaultStore, help="puzzle store file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'pack':
+            with OpenInput(args.input, 'r') as fileInput, OpenOutput(args.output, 'wb') as fileOutput:
+                with PackedWriter(fileOutput) as writer:
+                    writer.WriteMany(ReadPuzzles(fileInput))
+            count = writer.count
+        elif args.command == 'unpack':
+            count = 0
+            with OpenInput(args.input, 'rb') as fileInput, OpenOutput(args.output, 'w') as fileOutput:
+                for listInput in PackedReader(fileInput).Chunks():
+                    fileOutput.write('\n'.join(listInput) + '\n')
+                    count += len(listInput)
+        elif args.command == 'import':
+            count = 0
+            with OpenInput(args.input, 'rb') as fileInput, PuzzleStore(args.store) as puzzleStore:
+                for listInput in PackedReader(fileInput).Chunks():
+                    puzzleStore.AppendMany((strInput, None, None) for strInput in listInput)
+                    count += len(listInput)
+        else:
+            with PuzzleStore(args.store) as puzzleStore, OpenOutput(args.output, 'wb') as fileOutput:
+                with PackedWriter(fileOutput) as writer:
+                    writer.WriteMany(puzzleStore.Puzzles())
+            count = writer.count
+    except (InvalidPuzzle, ValueError) as e:
+        parser.exit(1, "%s\n" % e)
+    sys.stderr.write("%d puzzles\n" % count)
+
+
+if __name__ == '__main__':
+    Main()
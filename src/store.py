@@ -0,0 +1,260 @@
+"""
+Persistent puzzle store, shared by all worker processes.
+
+The store is a file of fixed size records, read through mmap, so lookup by index is O(1)
+and the puzzles are not loaded into memory of every process.
+    header : 8 bytes magic, 4 bytes record size, 4 bytes grade scheme
+    record : 81 bytes puzzle, 81 bytes answer ('0' * 81 when unknown), 1 byte grade (255 when unknown), '\\n'
+Appends take an exclusive file lock, so they are safe across processes.
+The grade scheme is the version of grade numbering (generator.techniqueGrades). Grades of a store
+written with older numbering are migrated when it is opened.
+"""
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked across processes
+    fcntl = None
+
+from sudoku import ClassicSudoku
+
+
+class PuzzleStore:
+
+    magic = b'DIGISDK1'
+    header = struct.Struct('<8sII')
+    cellCount = ClassicSudoku.cellCount
+    recordSize = 2 * ClassicSudoku.cellCount + 2
+    noGrade = 255
+    noAnswer = '0' * ClassicSudoku.cellCount
+    gradeScheme = 1
+    # Grade scheme -> {grade : grade in next scheme}
+    # Scheme 0 had grades 0 to 5, 5 for search, which is 9 since X-Wing, Swordfish, XY-Wing and simple coloring
+    gradeMigrations = {0: {5: 9}}
+
+    def __init__(self, path, grader=None):
+        """
+        Parameters:
+            path: store file, created when it does not exist
+            grader: function puzzle string -> grade, used to grade again the records whose grade
+                    changed meaning since the store was written. Without it the grades are only remapped.
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self.lock = threading.Lock()
+        self.map = None
+        self.count = 0
+        # grade -> list of index, built incrementally by GetIndexByGrade
+        self.gradeIndex = {}
+        self.indexedCount = 0
+        with self.FileLock():
+            if os.fstat(self.fd).st_size == 0:
+                os.write(self.fd, PuzzleStore.header.pack(PuzzleStore.magic, PuzzleStore.recordSize,
+                                                          PuzzleStore.gradeScheme))
+        self.Refresh()
+        magic, recordSize, gradeScheme = PuzzleStore.header.unpack_from(self.map, 0)
+        if magic != PuzzleStore.magic or recordSize != PuzzleStore.recordSize:
+            raise ValueError("%s is not a puzzle store" % path)
+        if gradeScheme != PuzzleStore.gradeScheme:
+            self.MigrateGrades(grader)
+
+    def FileLock(self):
+        return _FileLock(self.fd)
+
+    def MigrateGrades(self, grader=None):
+        """
+        This function rewrites grades of older grade scheme in place, under exclusive file lock,
+        and sets the grade scheme of the header.
+        Parameters:
+            grader: see __init__
+        """
+        with self.FileLock():
+            # pwrite ignores the offset on a descriptor opened with O_APPEND
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                magic, recordSize, gradeScheme = PuzzleStore.header.unpack(os.pread(fd, PuzzleStore.header.size, 0))
+                if gradeScheme == PuzzleStore.gradeScheme:
+                    # Migrated by another process meanwhile
+                    return
+                if gradeScheme > PuzzleStore.gradeScheme:
+                    raise ValueError("%s has grade scheme %d, newer than %d" % (self.path, gradeScheme,
+                                                                              PuzzleStore.gradeScheme))
+                count = self.Refresh()
+                gradeOffset = PuzzleStore.header.size + 2 * PuzzleStore.cellCount
+                for index in range(count):
+                    offset = gradeOffset + index * PuzzleStore.recordSize
+                    grade = newGrade = self.map[offset]
+                    for scheme in range(gradeScheme, PuzzleStore.gradeScheme):
+                        newGrade = PuzzleStore.gradeMigrations[scheme].get(newGrade, newGrade)
+                    if newGrade != grade and grader is not None:
+                        newGrade = grader(self.GetPuzzle(index))
+                    if newGrade != grade:
+                        os.pwrite(fd, bytes((newGrade,)), offset)
+                os.pwrite(fd, PuzzleStore.header.pack(magic, recordSize, PuzzleStore.gradeScheme), 0)
+            finally:
+                os.close(fd)
+
+    def Refresh(self):
+        """
+        This function maps the file again, if other processes appended records.
+        The old map is not closed, readers may still hold it. It is released with its last reference.
+        Returns:
+            Number of records
+        """
+        with self.lock:
+            size = os.fstat(self.fd).st_size
+            count = (size - PuzzleStore.header.size) // PuzzleStore.recordSize
+            if self.map is None or count != self.count:
+                self.map = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+                self.count = count
+            return self.count
+
+    def __len__(self):
+        return self.Refresh()
+
+    def Locate(self, index):
+        """
+        This function returns the map to read the record from, and offset of the record.
+        Readers keep this map, as Refresh may replace self.map meanwhile.
+        Returns:
+            Tuple of (map ; offset)
+        """
+        mapped = self.map
+        if index >= 0 and index >= PuzzleStore.MappedCount(mapped):
+            self.Refresh()
+            mapped = self.map
+        if index < 0 or index >= PuzzleStore.MappedCount(mapped):
+            raise IndexError("puzzle index out of range")
+        return mapped, PuzzleStore.header.size + index * PuzzleStore.recordSize
+
+    @staticmethod
+    def MappedCount(mapped):
+        return (len(mapped) - PuzzleStore.header.size) // PuzzleStore.recordSize
+
+    def GetPuzzle(self, index):
+        mapped, offset = self.Locate(index)
+        return mapped[offset:offset + PuzzleStore.cellCount].decode('ascii')
+
+    def Get(self, index):
+        """
+        This function returns record by index.
+        Returns:
+            Tuple of (puzzle ; answer or None ; grade or None)
+        """
+        mapped, offset = self.Locate(index)
+        record = mapped[offset:offset + PuzzleStore.recordSize]
+        strInput = record[:PuzzleStore.cellCount].decode('ascii')
+        strAnswer = record[PuzzleStore.cellCount:2 * PuzzleStore.cellCount].decode('ascii')
+        grade = record[2 * PuzzleStore.cellCount]
+        return (strInput,
+                None if strAnswer == PuzzleStore.noAnswer else strAnswer,
+                None if grade == PuzzleStore.noGrade else grade)
+
+    def Puzzles(self, start=0, stop=None):
+        """
+        This function yields puzzle strings from index start up to stop.
+        All puzzles are read from the map of the first call, so a concurrent Refresh does not affect it.
+        """
+        self.Refresh()
+        mapped = self.map
+        count = PuzzleStore.MappedCount(mapped)
+        stop = count if stop is None else min(stop, count)
+        for index in range(start, stop):
+            offset = PuzzleStore.header.size + index * PuzzleStore.recordSize
+            yield mapped[offset:offset + PuzzleStore.cellCount].decode('ascii')
+
+    @staticmethod
+    def Pack(strInput, strAnswer=None, grade=None):
+        if len(strInput) != PuzzleStore.cellCount or (strAnswer and len(strAnswer) != PuzzleStore.cellCount):
+            raise ValueError("puzzle and answer must have %d cells" % PuzzleStore.cellCount)
+        return (strInput + (strAnswer or PuzzleStore.noAnswer)).encode('ascii') \
+            + bytes((PuzzleStore.noGrade if grade is None else grade, 10))
+
+    def Append(self, strInput, strAnswer=None, grade=None):
+        """
+        This function appends one puzzle.
+        Returns:
+            index of the puzzle
+        """
+        return self.AppendMany([(strInput, strAnswer, grade)])
+
+    def AppendMany(self, records, onlyIfEmpty=False, onlyNew=False):
+        """
+        This function appends puzzles with one write, under exclusive file lock.
+        Parameters:
+            records: iterable of (puzzle ; answer or None ; grade or None)
+            onlyIfEmpty: append only when the store has no puzzle yet, e.g. for initial content
+            onlyNew: append only the puzzles which are not in the store yet, e.g. for a pool read at every start.
+                     The whole store is read for it.
+        Returns:
+            index of the last appended puzzle, None if nothing was appended
+        """
+        if not onlyNew:
+            data = b''.join(PuzzleStore.Pack(*record) for record in records)
+        with self.FileLock():
+            size = os.fstat(self.fd).st_size
+            count = (size - PuzzleStore.header.size) // PuzzleStore.recordSize
+            if onlyIfEmpty and count:
+                return None
+            if onlyNew:
+                # Under the file lock, so that processes started together do not append the same puzzles
+                setPuzzle = set(self.Puzzles(0, count))
+                listData = []
+                for record in records:
+                    if record[0] not in setPuzzle:
+                        setPuzzle.add(record[0])
+                        listData.append(PuzzleStore.Pack(*record))
+                data = b''.join(listData)
+            if not data:
+                return None
+            os.write(self.fd, data)
+        return count + len(data) // PuzzleStore.recordSize - 1
+
+    def GetIndexByGrade(self):
+        """
+        This function returns dictionary grade -> list of index.
+        Only the records appended since last call are scanned.
+        """
+        count = self.Refresh()
+        with self.lock:
+            mapped = self.map
+            gradeOffset = PuzzleStore.header.size + 2 * PuzzleStore.cellCount
+            for index in range(self.indexedCount, count):
+                grade = mapped[gradeOffset + index * PuzzleStore.recordSize]
+                if grade != PuzzleStore.noGrade:
+                    self.gradeIndex.setdefault(grade, []).append(index)
+            self.indexedCount = max(self.indexedCount, count)
+            return self.gradeIndex
+
+    def Close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+class _FileLock:
+    """
+    Exclusive lock on the store file, across processes.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
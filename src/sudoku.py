@@ -1,23 +1,162 @@
 import abc
+import base64
+import binascii
 import itertools
+import sys
+import time
+from array import array
+
+class SudokuError(Exception):
+    """
+    Base class of errors raised by the solver.
+    """
+
+class SolveTimeout(SudokuError):
+    """
+    Solve did not finish within its time limit.
+    """
+
+class InvalidPuzzle(SudokuError):
+    """
+    Puzzle string is not valid: wrong length, unknown symbol, or same digit given twice in a region.
+    """
+
+class Contradiction(InvalidPuzzle):
+    """
+    Puzzle has no solution: an empty cell has no possible value, or a digit has no possible cell in a region.
+    """
+
+class BitTable(dict):
+    """
+    Bit table, which computes the entry of a bitmap on first use.
+    It is used instead of full tuple, when the board is too large for 2 ** (size + 1) entries.
+    """
+    __slots__ = ('function',)
+
+    # Entries kept at most. The table is cleared when it grows beyond this
+    maxEntries = 1 << 16
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, bitmap):
+        if len(self) >= BitTable.maxEntries:
+            self.clear()
+        value = self[bitmap] = self.function(bitmap)
+        return value
 
 class Sudoku(metaclass=abc.ABCMeta):
+    __slots__ = ()
+
     # Static Variables
     size = 1
 
     @abc.abstractmethod
-    def Solve(self):
+    def Solve(self, timeLimit=None):
         pass
 
     @abc.abstractmethod
     def Load(self, strInput):
         pass
 
+class SolverStats:
+    """
+    Instrumentation of the solver: per technique call count, wall time, eliminated candidates and
+    placed cells, plus number of solves and FSM loop iterations.
+    Set it as stats of one or more solvers, e.g. s.stats = SolverStats()
+    """
+
+    def __init__(self):
+        self.techniques = {}
+        self.solves = 0
+        self.iterations = 0
+
+    def RecordTechnique(self, technique, seconds, eliminated, placed):
+        record = self.techniques.get(technique)
+        if record is None:
+            record = self.techniques[technique] = {'calls': 0, 'seconds': 0.0, 'eliminated': 0, 'placed': 0}
+        record['calls'] += 1
+        record['seconds'] += seconds
+        record['eliminated'] += eliminated
+        record['placed'] += placed
+
+    def RecordSolve(self, iterations):
+        self.solves += 1
+        self.iterations += iterations
+
+    def Merge(self, other):
+        """
+        This function adds counters of other SolverStats object into this object.
+        """
+        for technique, otherRecord in other.techniques.items():
+            record = self.techniques.get(technique)
+            if record is None:
+                record = self.techniques[technique] = {'calls': 0, 'seconds': 0.0, 'eliminated': 0, 'placed': 0}
+            for key, value in otherRecord.items():
+                record[key] += value
+        self.solves += other.solves
+        self.iterations += other.iterations
+
+    def ToDict(self):
+        return {
+            'solves': self.solves,
+            'iterations': self.iterations,
+            'techniques': {technique: dict(record) for technique, record in self.techniques.items()},
+        }
+
+    def ToPrometheus(self, prefix='sudoku'):
+        """
+        This function renders the counters in Prometheus text exposition format.
+        """
+        lines = [
+            '# HELP %s_solves_total Number of solved puzzles.' % prefix,
+            '# TYPE %s_solves_total counter' % prefix,
+            '%s_solves_total %d' % (prefix, self.solves),
+            '# HELP %s_fsm_iterations_total Number of FSM loop iterations over all solves.' % prefix,
+            '# TYPE %s_fsm_iterations_total counter' % prefix,
+            '%s_fsm_iterations_total %d' % (prefix, self.iterations),
+        ]
+        metrics = (
+            ('calls', 'technique_calls_total', 'Number of calls of each technique.', '%d'),
+            ('seconds', 'technique_seconds_total', 'Wall time spent in each technique.', '%.6f'),
+            ('eliminated', 'technique_eliminated_total', 'Candidate values removed by each technique.', '%d'),
+            ('placed', 'technique_placed_total', 'Cells filled by each technique.', '%d'),
+        )
+        for key, name, text, valueFormat in metrics:
+            lines.append('# HELP %s_%s %s' % (prefix, name, text))
+            lines.append('# TYPE %s_%s counter' % (prefix, name))
+            for technique, record in sorted(self.techniques.items()):
+                lines.append(('%s_%s{technique="%s"} ' + valueFormat) % (prefix, name, technique, record[key]))
+        return '\n'.join(lines) + '\n'
+
+
 class ClassicSudoku(Sudoku):
+    # Per-instance state. The board is kept in fixed size arrays, not in dictionaries.
+    __slots__ = ('strInput', 'strOutput', 'listRow', 'listCol', 'listBlock', 'options', 'output',
+                 'eliminated', 'changed', 'tracer', 'stats', 'deadline', 'digitPos',
+                 'clock', 'unitStamp', 'techniqueClock', 'schedule')
+
     # Static Variables
     size = 9
     sqrt_size = 3
     invert = 1022
+    # Symbol of each digit in puzzle string, '0' for empty cell
+    symbols = '0123456789'
+    # Type code of the bitmap arrays, wide enough for bit 'size'
+    typecode = 'H'
+    # Type code of candidate values in Serialize, same width on every platform: 'L' is 8 bytes on 64 bit Linux
+    stateTypecode = 'H'
+    # Largest size, for which the bit tables are computed in full
+    fullBitTableSize = 12
+    # Default order of the techniques tried by Solve after 'function zero'. See schedule.
+    techniqueOrder = ('SolveExplicitRegion', 'SolveImplicitRegion', 'SolveCandidateLineTechnique',
+                      'SolveMultipleLinesTechnique', 'SolveXWingTechnique', 'SolveSwordfishTechnique',
+                      'SolveXYWingTechnique', 'SolveSimpleColoringTechnique')
+    # Propagation after every guess of SearchSolutions, from guess number strongSearchNodes on.
+    # Before that only 'function zero', as the stronger propagation costs more than it saves on short searches
+    searchTechniques = ('SolveExplicitRegion', 'SolveImplicitRegion', 'SolveCandidateLineTechnique')
+    strongSearchNodes = 100
 
     # Static Variables. Response codes
     ZERO_TO_OK = 200
@@ -29,7 +168,17 @@ class ClassicSudoku(Sudoku):
     THREE_BACKTO_ZERO = 30
     THREE_TO_FOUR = 4
     FOUR_BACK_TO_ZERO = 40
-    FOUR_TO_ERROR = 500
+    FOUR_TO_FIVE = 5
+    XWING_BACKTO_ZERO = 50
+    XWING_TO_NEXT = 6
+    SWORDFISH_BACKTO_ZERO = 60
+    SWORDFISH_TO_NEXT = 7
+    XYWING_BACKTO_ZERO = 70
+    XYWING_TO_NEXT = 8
+    COLORING_BACKTO_ZERO = 80
+    COLORING_TO_NEXT = 9
+    FIVE_TO_OK = 201
+    FIVE_TO_ERROR = 500
 
     char2BitMap = {
         '0': 0,
@@ -56,146 +205,612 @@ class ClassicSudoku(Sudoku):
     }
 
     # Static Methods
-    GetRowIndex = staticmethod(lambda i: i // ClassicSudoku.size)
-    GetColIndex = staticmethod(lambda i: i % ClassicSudoku.size)
-    GetBlockIndex = staticmethod(lambda x, y : ClassicSudoku.sqrt_size * ( y // ClassicSudoku.sqrt_size )
-                                                + ( x // ClassicSudoku.sqrt_size ))
+    GetRowIndex = classmethod(lambda cls, i: i // cls.size)
+    GetColIndex = classmethod(lambda cls, i: i % cls.size)
+    GetBlockIndex = classmethod(lambda cls, x, y : cls.sqrt_size * ( y // cls.sqrt_size )
+                                                   + ( x // cls.sqrt_size ))
+
+    # Static Variables. Index tables, computed once by BuildIndexTables
+    cellCount = 0
+    cellRow = ()     # cellIndex -> rowIndex
+    cellCol = ()     # cellIndex -> colIndex
+    cellBlock = ()   # cellIndex -> blockIndex
+    rowCells = ()    # rowIndex -> tuple of cellIndex
+    colCells = ()    # colIndex -> tuple of cellIndex
+    blockCells = ()  # blockIndex -> tuple of cellIndex
+    cellPeers = ()   # cellIndex -> tuple of cellIndex sharing a row, column or block
+    unitCells = ()   # unitIndex -> tuple of cellIndex. Units are all rows, then all columns, then all blocks
+    cellUnits = ()   # cellIndex -> (row unitIndex, column unitIndex, block unitIndex)
+    cellUnitSlots = ()  # cellIndex -> ((unitIndex * (size + 1), position bit of the cell in the unit), ...)
+    blockRowMasks = ()  # row of block -> bitmap of its positions in the block
+    blockColMasks = ()  # column of block -> bitmap of its positions in the block
+
+    # Static Variables. Bit tables, indexed by candidate bitmap, computed once by BuildIndexTables
+    digitBit = ()    # digit -> bitmap of the digit, 0 for digit 0
+    bitCount = ()    # bitmap -> number of candidate values
+    lowestDigit = () # bitmap -> smallest digit of bitmap, 0 for empty bitmap
+    bitDigits = ()   # bitmap -> tuple of digits of bitmap
+    digitCode = ()   # digit -> ASCII code of its symbol
+    codeBit = {}     # ASCII code of symbol -> bitmap of the digit
+
+    @classmethod
+    def IsValidInput(cls, strInput):
+        """
+        This function checks that strInput is a puzzle string: one symbol per cell, '0' for empty cell.
+        """
+        return isinstance(strInput, str) and len(strInput) == cls.cellCount and not strInput.strip(cls.symbols)
+
+    @classmethod
+    def BuildIndexTables(cls):
+        """
+        This function precomputes the geometry of the grid, so that the algorithms do not need to
+        evaluate GetRowIndex, GetColIndex and GetBlockIndex for every cell on every pass.
+        Parameters:
+            None
+        Returns:
+            None
+        """
+        cellCount = cls.cellCount = cls.size * cls.size
+        cls.cellRow = tuple(cls.GetRowIndex(i) for i in range(cellCount))
+        cls.cellCol = tuple(cls.GetColIndex(i) for i in range(cellCount))
+        cls.cellBlock = tuple(cls.GetBlockIndex(cls.cellCol[i], cls.cellRow[i]) for i in range(cellCount))
+        cls.rowCells = tuple(tuple(i for i in range(cellCount) if cls.cellRow[i] == r) for r in range(cls.size))
+        cls.colCells = tuple(tuple(i for i in range(cellCount) if cls.cellCol[i] == c) for c in range(cls.size))
+        cls.blockCells = tuple(tuple(i for i in range(cellCount) if cls.cellBlock[i] == b) for b in range(cls.size))
+        cls.cellPeers = tuple(
+            tuple(sorted((set(cls.rowCells[cls.cellRow[i]]) | set(cls.colCells[cls.cellCol[i]])
+                          | set(cls.blockCells[cls.cellBlock[i]])) - {i}))
+            for i in range(cellCount))
+        cls.unitCells = cls.rowCells + cls.colCells + cls.blockCells
+        cls.cellUnits = tuple((cls.cellRow[i], cls.size + cls.cellCol[i], 2 * cls.size + cls.cellBlock[i])
+                              for i in range(cellCount))
+        # Position k (1-based) of a cell in its unit is bit 1 << k, same layout as the digit bitmaps
+        cls.cellUnitSlots = tuple(tuple((unitIndex * (cls.size + 1), 1 << (cls.unitCells[unitIndex].index(i) + 1))
+                                        for unitIndex in cls.cellUnits[i])
+                                  for i in range(cellCount))
+        cls.blockRowMasks = tuple(sum(1 << (r * cls.sqrt_size + c + 1) for c in range(cls.sqrt_size))
+                                  for r in range(cls.sqrt_size))
+        cls.blockColMasks = tuple(sum(1 << (r * cls.sqrt_size + c + 1) for r in range(cls.sqrt_size))
+                                  for c in range(cls.sqrt_size))
+
+        digits = range(1, cls.size + 1)
+        cls.digitBit = (0,) + tuple(1 << digit for digit in digits)
+        cls.digitCode = tuple(ord(symbol) for symbol in cls.symbols)
+        cls.codeBit = {ord(symbol): cls.digitBit[digit] for digit, symbol in enumerate(cls.symbols)}
+        BitDigits = lambda bitmap: tuple(digit for digit in digits if bitmap & (1 << digit))
+        if cls.size <= cls.fullBitTableSize:
+            cls.bitDigits = tuple(BitDigits(bitmap) for bitmap in range(1 << (cls.size + 1)))
+            cls.bitCount = tuple(len(listDigit) for listDigit in cls.bitDigits)
+            cls.lowestDigit = tuple(listDigit[0] if listDigit else 0 for listDigit in cls.bitDigits)
+        else:
+            # Full table would have 2 ** (size + 1) entries
+            cls.bitDigits = BitTable(BitDigits)
+            cls.bitCount = BitTable(lambda bitmap: bin(bitmap).count('1'))
+            cls.lowestDigit = BitTable(lambda bitmap: (bitmap & -bitmap).bit_length() - 1 if bitmap else 0)
 
     def __init__(self):
-        self.listRow = [i for i in itertools.repeat(0, ClassicSudoku.size)]
-        self.listCol = [i for i in itertools.repeat(0, ClassicSudoku.size)]
-        self.listBlock = [i for i in itertools.repeat(0, ClassicSudoku.size)]
-        self.options = {}
-        self.output = {}
+        self.strInput = ''
+        self.strOutput = ''
+        # Bitmap of digits already placed in each row, column and block
+        self.listRow = array(self.typecode, [0]) * self.size
+        self.listCol = array(self.typecode, [0]) * self.size
+        self.listBlock = array(self.typecode, [0]) * self.size
+        # Bitmap of candidate values for each cellIndex. Zero once the cell is filled.
+        self.options = array(self.typecode, [0]) * self.cellCount
+        # Final value for each cellIndex, as ASCII digit. '0' while the cell is empty.
+        self.output = bytearray(b'0') * self.cellCount
+        # Number of candidate values removed from options since Load
+        self.eliminated = 0
+        # Work queue of cellIndex, whose candidate values changed since last SolveSingleCandidate
+        self.changed = set()
+        # Optional callback, see RunTechnique
+        self.tracer = None
+        # Optional SolverStats object, see RunTechnique
+        self.stats = None
+        # time.perf_counter() value, after which Solve raises SolveTimeout. None for no limit
+        self.deadline = None
+        # Index unitIndex * (size + 1) + digit -> bitmap of positions in the unit, where the digit is a candidate.
+        # It is kept in step with options by Load, SetOptions and PlaceDigit.
+        self.digitPos = array(self.typecode, [0]) * (len(self.unitCells) * (self.size + 1))
+        # Change counter. It is increased on every change of candidate values, and stored in
+        # unitStamp for the changed units, so that a technique rescans only the units changed since its last run
+        self.clock = 0
+        self.unitStamp = array('L', [0]) * len(self.unitCells)
+        # Technique name -> clock at its last run, see GetDirtyUnits
+        self.techniqueClock = {}
+        # Optional order of technique names, instead of techniqueOrder
+        self.schedule = None
 
     def Load(self, strInput):
+        """
+        This function loads the puzzle, and computes candidate values of all empty cells.
+        The puzzle is checked first, so that a puzzle which is not valid costs no solve.
+        Parameters:
+            strInput: puzzle string, '0' for empty cell
+        Returns:
+            None
+        Raises:
+            InvalidPuzzle, if length or symbols are wrong, or a digit is given twice in a region
+            Contradiction, if an empty cell has no possible value
+        """
+        if not self.IsValidInput(strInput):
+            raise InvalidPuzzle("Puzzle must be %d symbols of %s" % (self.cellCount, self.symbols))
         self.strInput = strInput
+        self.output[:] = strInput.encode('ascii')
 
         for cellIndex in range(0, len(strInput)):
-            if strInput[cellIndex] == '0':
-                self.options[cellIndex] = 0
-            else:
-                rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                colIndex = ClassicSudoku.GetColIndex(cellIndex)
-                blockIndex = ClassicSudoku.GetBlockIndex(colIndex, rowIndex)
-                bitmap = ClassicSudoku.char2BitMap[strInput[cellIndex]]
+            if strInput[cellIndex] != '0':
+                bitmap = self.char2BitMap[strInput[cellIndex]]
+                rowIndex = self.cellRow[cellIndex]
+                colIndex = self.cellCol[cellIndex]
+                blockIndex = self.cellBlock[cellIndex]
+                if (self.listRow[rowIndex] | self.listCol[colIndex] | self.listBlock[blockIndex]) & bitmap:
+                    raise InvalidPuzzle("Digit %s is given twice in row %d, column %d or block %d"
+                                        % (strInput[cellIndex], rowIndex + 1, colIndex + 1, blockIndex + 1))
                 self.listRow[rowIndex] |= bitmap
                 self.listCol[colIndex] |= bitmap
                 self.listBlock[blockIndex] |= bitmap
 
-        for cellIndex in self.options:
-            rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-            colIndex = ClassicSudoku.GetColIndex(cellIndex)
-            blockIndex = ClassicSudoku.GetBlockIndex(colIndex, rowIndex)
+        for cellIndex in range(0, len(strInput)):
+            if strInput[cellIndex] != '0':
+                continue
+            rowIndex = self.cellRow[cellIndex]
+            colIndex = self.cellCol[cellIndex]
+            blockIndex = self.cellBlock[cellIndex]
             temp = self.listRow[rowIndex] | self.listCol[colIndex] | self.listBlock[blockIndex]
-            self.options[cellIndex] = ClassicSudoku.invert - temp
+            if temp == self.invert:
+                raise Contradiction("Cell in row %d, column %d has no possible value" % (rowIndex + 1, colIndex + 1))
+            self.options[cellIndex] = self.invert - temp
+            self.changed.add(cellIndex)
+        self.BuildDigitPositions()
+        self.techniqueClock.clear()
 
         # print("After Intialization")
         # self.PrintOptions()
 
-    def Solve(self):
+    def BuildDigitPositions(self):
         """
-        This function implements FSM = Finite State Machine
+        This function computes digitPos from options of all cells.
+        """
+        digitPos = self.digitPos
+        bitDigits = self.bitDigits
+        for i in range(len(digitPos)):
+            digitPos[i] = 0
+        for cellIndex in range(self.cellCount):
+            for digit in bitDigits[self.options[cellIndex]]:
+                for unitBase, positionBit in self.cellUnitSlots[cellIndex]:
+                    digitPos[unitBase + digit] |= positionBit
+
+    def Snapshot(self):
+        """
+        This function takes a copy of the board state, e.g. before a guess.
         Parameters:
             None
+        Returns:
+            Opaque snapshot, to be passed to Restore
+        """
+        return (self.options[:], self.output[:], self.listRow[:], self.listCol[:], self.listBlock[:],
+                set(self.changed), self.digitPos[:], self.unitStamp[:], dict(self.techniqueClock))
 
+    def Restore(self, snapshot):
+        """
+        This function brings back the board state saved by Snapshot.
+        The snapshot is copied, so it can be restored again later.
+        Parameters:
+            snapshot returned by Snapshot
         Returns:
             None
         """
-        status = self.SolveSingleCandidate() # function zero
-        while True:
-            if status == ClassicSudoku.ZERO_TO_OK:
-                return
-            if status == ClassicSudoku.FOUR_TO_ERROR:
-                return
-            if status == ClassicSudoku.ZERO_TO_ONE:
-                status = self.SolveExplicitRegion() # function one
-            if status == ClassicSudoku.ONE_BACKTO_ZERO:
-                status = self.SolveSingleCandidate() # function zero
-            if status == ClassicSudoku.ONE_TO_TWO:
-                status = self.SolveImplicitRegion() # function two
-            if status == ClassicSudoku.TWO_BACKTO_ZERO:
-                status = self.SolveSingleCandidate() # function zero
-            if status == ClassicSudoku.TWO_TO_THREE:
-                status = self.SolveCandidateLineTechnique() # function three
-            if status == ClassicSudoku.THREE_BACKTO_ZERO:
-                status = self.SolveSingleCandidate() # function zero
-            if status == ClassicSudoku.THREE_TO_FOUR:
-                status = self.SolveMultipleLinesTechnique() # function four
-            if status == ClassicSudoku.FOUR_BACK_TO_ZERO:
-                status = self.SolveSingleCandidate() # function zero
+        options, output, listRow, listCol, listBlock, changed, digitPos, unitStamp, techniqueClock = snapshot
+        self.changed = set(changed)
+        # Change counters as seen by the techniques at the snapshot, so that they rescan only the units
+        # changed since then
+        self.unitStamp[:] = unitStamp
+        self.techniqueClock = dict(techniqueClock)
+        self.digitPos[:] = digitPos
+        self.options[:] = options
+        self.output[:] = output
+        self.listRow[:] = listRow
+        self.listCol[:] = listCol
+        self.listBlock[:] = listBlock
+
+    def Serialize(self):
+        """
+        This function returns the board state as compact string, e.g. to be held by client between hint requests.
+        The state is the givens, the filled cells and the candidate values of the empty cells.
+        FSM has no other state between steps, see Step.
+        Parameters:
+            None
+        Returns:
+            URL safe base64 string, to be passed to Deserialize
+        """
+        options = array(self.stateTypecode, self.options)
+        if sys.byteorder == 'big':
+            options.byteswap()
+        data = self.strInput.encode('ascii') + bytes(self.output) + options.tobytes()
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    @classmethod
+    def Deserialize(cls, strState):
+        """
+        This function creates solver from the string returned by Serialize.
+        The state is checked, as it may come from client: raises SudokuError, if it is not valid,
+        and Contradiction, if it has no solution.
+        Parameters:
+            strState: string returned by Serialize
+        Returns:
+            New solver object, ready for Step or Solve
+        """
+        options = array(cls.stateTypecode)
+        try:
+            data = base64.urlsafe_b64decode(strState.encode('ascii'))
+            strInput = data[:cls.cellCount].decode('ascii')
+            strOutput = data[cls.cellCount:2 * cls.cellCount].decode('ascii')
+            options.frombytes(data[2 * cls.cellCount:])
+        except (AttributeError, UnicodeError, ValueError, binascii.Error):
+            raise SudokuError("Solver state not valid")
+        if sys.byteorder == 'big':
+            options.byteswap()
+        if len(options) != cls.cellCount or not cls.IsValidInput(strInput) or not cls.IsValidInput(strOutput):
+            raise SudokuError("Solver state not valid")
+        for cellIndex in range(cls.cellCount):
+            if (strInput[cellIndex] != '0' and strInput[cellIndex] != strOutput[cellIndex]) \
+                    or options[cellIndex] & ~cls.invert or (strOutput[cellIndex] == '0') != (options[cellIndex] != 0):
+                raise SudokuError("Solver state not valid")
+
+        s = cls()
+        s.strInput = strInput
+        s.output[:] = strOutput.encode('ascii')
+        s.options[:] = array(cls.typecode, options)
+        # Same checks as Load: no digit placed twice in a region, no candidate value placed in a peer
+        for cellIndex in range(cls.cellCount):
+            bitmap = s.char2BitMap[strOutput[cellIndex]]
+            rowIndex = s.cellRow[cellIndex]
+            colIndex = s.cellCol[cellIndex]
+            blockIndex = s.cellBlock[cellIndex]
+            if (s.listRow[rowIndex] | s.listCol[colIndex] | s.listBlock[blockIndex]) & bitmap:
+                raise SudokuError("Solver state not valid")
+            s.listRow[rowIndex] |= bitmap
+            s.listCol[colIndex] |= bitmap
+            s.listBlock[blockIndex] |= bitmap
+        for cellIndex in range(cls.cellCount):
+            if options[cellIndex]:
+                if options[cellIndex] & (s.listRow[s.cellRow[cellIndex]] | s.listCol[s.cellCol[cellIndex]]
+                                         | s.listBlock[s.cellBlock[cellIndex]]):
+                    raise SudokuError("Solver state not valid")
+                s.changed.add(cellIndex)
+        s.BuildDigitPositions()
+        if not s.IsConsistent():
+            raise Contradiction("Solver state has no solution")
+        if s.GetSolvedCount() == cls.cellCount:
+            s.strOutput = strOutput
+        return s
+
+    def SetOptions(self, cellIndex, bitmap):
+        """
+        This function reduces candidate values of an empty cell, and queues the cell for SolveSingleCandidate.
+        All algorithms remove candidate values through this function.
+        Parameters:
+            cellIndex: empty cell
+            bitmap: new candidate values, subset of current candidate values
+        Returns:
+            None
+        """
+        removed = self.options[cellIndex] ^ bitmap
+        self.eliminated += self.bitCount[removed]
+        self.options[cellIndex] = bitmap
+        self.changed.add(cellIndex)
+        self.clock += 1
+        for unitIndex in self.cellUnits[cellIndex]:
+            self.unitStamp[unitIndex] = self.clock
+        digitPos = self.digitPos
+        for digit in self.bitDigits[removed]:
+            for unitBase, positionBit in self.cellUnitSlots[cellIndex]:
+                digitPos[unitBase + digit] ^= positionBit
+
+    def PlaceDigit(self, cellIndex, bitmap):
+        """
+        This function fills an empty cell, and removes that digit from candidate values of all its peers.
+        The changed peers are queued for SolveSingleCandidate.
+        Parameters:
+            cellIndex: empty cell
+            bitmap: bitmap of the digit
+        Returns:
+            None
+        """
+        options = self.options
+        changed = self.changed
+        digitPos = self.digitPos
+        cellUnitSlots = self.cellUnitSlots
+        cellUnits = self.cellUnits
+        unitStamp = self.unitStamp
+        clock = self.clock = self.clock + 1
+        digit = self.lowestDigit[bitmap]
+        # Store final answer in output array
+        self.output[cellIndex] = self.digitCode[digit]
+        self.listRow[self.cellRow[cellIndex]] |= bitmap
+        self.listCol[self.cellCol[cellIndex]] |= bitmap
+        self.listBlock[self.cellBlock[cellIndex]] |= bitmap
+        for otherDigit in self.bitDigits[options[cellIndex]]:
+            for unitBase, positionBit in cellUnitSlots[cellIndex]:
+                digitPos[unitBase + otherDigit] ^= positionBit
+        options[cellIndex] = 0
+        for unitIndex in cellUnits[cellIndex]:
+            unitStamp[unitIndex] = clock
+        for k in self.cellPeers[cellIndex]:
+            if options[k] & bitmap:
+                options[k] ^= bitmap
+                self.eliminated += 1
+                changed.add(k)
+                for unitBase, positionBit in cellUnitSlots[k]:
+                    digitPos[unitBase + digit] ^= positionBit
+                for unitIndex in cellUnits[k]:
+                    unitStamp[unitIndex] = clock
+
+    def GetEmptyCells(self):
+        """
+        This function returns list of cellIndex of all empty cells, which still have candidate values.
+        """
+        options = self.options
+        return [cellIndex for cellIndex in range(self.cellCount) if options[cellIndex]]
+
+    def GetSolvedCount(self):
+        """
+        This function returns number of filled cells, including givens.
+        """
+        return self.cellCount - self.output.count(b'0')
+
+    def Solve(self, timeLimit=None):
+        """
+        This function implements FSM = Finite State Machine, as technique scheduler.
+        step 1: 'function zero' places all naked and hidden singles.
+        step 2: The techniques of the schedule are tried in order, until one of them makes progress.
+                Then FSM goes back to step 1. Every technique rescans only the units changed since its last run.
+        step 3: If no technique makes progress, then 'function five' searches the remaining candidates.
+        Parameters:
+            timeLimit: seconds. The deadline is checked between FSM steps and while searching,
+                       and SolveTimeout is raised when it is passed. None for no limit.
+
+        Returns:
+            None
+        Raises:
+            Contradiction, as soon as propagation or search finds that the puzzle has no solution
+        """
+        self.deadline = time.perf_counter() + timeLimit if timeLimit is not None else None
+        iterations = 0
+        schedule = [getattr(type(self), name) for name in (self.schedule or self.techniqueOrder)]
+        status = self.RunTechnique(ClassicSudoku.SolveSingleCandidate) # function zero
+        while status != ClassicSudoku.ZERO_TO_OK:
+            iterations += 1
+            self.CheckDeadline()
+            for technique in schedule:
+                clock = self.clock
+                self.RunTechnique(technique) # functions one to four
+                if self.clock != clock:
+                    break
+            else:
+                if self.RunTechnique(ClassicSudoku.SolveBySearch) == ClassicSudoku.FIVE_TO_ERROR: # function five
+                    raise Contradiction("Puzzle has no solution")
+                break
+            status = self.RunTechnique(ClassicSudoku.SolveSingleCandidate) # function zero
+
+        if self.stats is not None:
+            self.stats.RecordSolve(iterations)
+
+    def GetDirtyUnits(self, technique):
+        """
+        This function returns the units changed since last run of the technique, and starts its new run.
+        Parameters:
+            technique: name of the technique
+        Returns:
+            List of unitIndex, all units on first run
+        """
+        lastClock = self.techniqueClock.get(technique)
+        self.techniqueClock[technique] = self.clock
+        if lastClock is None:
+            return range(len(self.unitCells))
+        unitStamp = self.unitStamp
+        return [unitIndex for unitIndex in range(len(unitStamp)) if unitStamp[unitIndex] > lastClock]
+
+    @classmethod
+    def ScheduleByStats(cls, stats):
+        """
+        This function orders the techniques by measured cost per yield: seconds per eliminated candidate.
+        Techniques not measured yet come first, so that they get measured.
+        Parameters:
+            stats: SolverStats
+        Returns:
+            Tuple of technique names, to be set as schedule
+        """
+        def Cost(technique):
+            record = stats.techniques.get(technique)
+            if not record or not record['calls']:
+                return 0.0
+            return record['seconds'] / (record['eliminated'] + record['placed'] + 1)
+        return tuple(sorted(cls.techniqueOrder, key=Cost))
+
+    def Step(self, timeLimit=None):
+        """
+        This function applies one deduction, e.g. for a hint.
+        step 1: If any cell has only one possible value (naked single), or any digit is possible in only one cell
+                of a region (hidden single), then set that value in that one cell.
+        step 2: Else the techniques of the schedule are tried in order, and the first one which makes progress
+                is reported with the candidate values removed by it.
+        step 3: Else one cell, with fewest possible values, is filled from the solution found by search.
+        Parameters:
+            timeLimit: seconds for the search, see Solve. None for no limit.
+        Returns:
+            Dictionary of technique name, list 'placed' of (cellIndex, digit) and list 'eliminated'
+            of (cellIndex, removed digits). Digits are written as in puzzle string.
+            None, if the puzzle is solved.
+        Raises:
+            Contradiction, if the puzzle has no solution
+        """
+        self.deadline = time.perf_counter() + timeLimit if timeLimit is not None else None
+        listEmpty = self.GetEmptyCells()
+        if self.GetSolvedCount() + len(listEmpty) != self.cellCount:
+            raise Contradiction("Empty cell has no possible value")
+        if not listEmpty:
+            return None
+        options = self.options
+        cellIndex, bitmap = self.FindSingle()
+        technique = 'SolveSingleCandidate'
+        if cellIndex is None:
+            schedule = [getattr(type(self), name) for name in (self.schedule or self.techniqueOrder)]
+            for method in schedule:
+                before = options[:]
+                clock = self.clock
+                self.RunTechnique(method)
+                if self.clock != clock:
+                    listEliminated = [(k, ''.join(self.symbols[digit] for digit in self.bitDigits[before[k] & ~options[k]]))
+                                      for k in listEmpty if before[k] != options[k]]
+                    return {'technique': method.__name__, 'placed': [], 'eliminated': listEliminated}
+            count, output = self.SearchSolutions(1)
+            if count == 0:
+                raise Contradiction("Puzzle has no solution")
+            cellIndex = min(listEmpty, key=lambda k: self.bitCount[options[k]])
+            bitmap = self.codeBit[output[cellIndex]]
+            technique = 'SolveBySearch'
+
+        self.PlaceDigit(cellIndex, bitmap)
+        if self.GetSolvedCount() == self.cellCount:
+            self.strOutput = self.output.decode('ascii')
+        return {'technique': technique, 'placed': [(cellIndex, chr(self.output[cellIndex]))], 'eliminated': []}
+
+    def FindSingle(self):
+        """
+        This function finds one naked single or hidden single, without setting it.
+        Returns:
+            Tuple of (cellIndex ; bitmap of the digit), (None ; 0) if there is no single
+        """
+        options = self.options
+        for cellIndex in range(self.cellCount):
+            if options[cellIndex] and self.bitCount[options[cellIndex]] == 1:
+                return cellIndex, options[cellIndex]
+        digitPos = self.digitPos
+        for unitIndex in range(len(self.unitCells)):
+            unitBase = unitIndex * (self.size + 1)
+            for digit in range(1, self.size + 1):
+                positions = digitPos[unitBase + digit]
+                if positions and self.bitCount[positions] == 1:
+                    return self.unitCells[unitIndex][self.lowestDigit[positions] - 1], self.digitBit[digit]
+        return None, 0
+
+    def CheckDeadline(self):
+        """
+        This function raises SolveTimeout, if deadline of the solve is passed.
+        """
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SolveTimeout("Solve did not finish within its time limit")
+
+    def RunTechnique(self, technique):
+        """
+        This function invokes one algorithm method, and reports it to tracer and stats if they are set.
+        The tracer is called as tracer(technique, status, eliminated, placed), where
+            technique is name of the algorithm method
+            status is the response code returned by it
+            eliminated is number of candidate values removed by it
+            placed is number of cells filled by it
+        Parameters:
+            technique: algorithm method, e.g. ClassicSudoku.SolveExplicitRegion
+        Returns:
+            Response code of the algorithm method
+        """
+        if self.tracer is None and self.stats is None:
+            return technique(self)
+        eliminated = self.eliminated
+        solved = self.GetSolvedCount()
+        start = time.perf_counter()
+        status = technique(self)
+        seconds = time.perf_counter() - start
+        eliminated = self.eliminated - eliminated
+        placed = self.GetSolvedCount() - solved
+        if self.stats is not None:
+            self.stats.RecordTechnique(technique.__name__, seconds, eliminated, placed)
+        if self.tracer is not None:
+            self.tracer(technique.__name__, status, eliminated, placed)
+        return status
+
+    @staticmethod
+    def PrintTrace(technique, status, eliminated, placed):
+        """
+        This function is just for debugging. It can be set as tracer to monitor progress on console.
+        """
+        print("%s status %d eliminated %d placed %d" % (technique, status, eliminated, placed))
 
     def SolveSingleCandidate(self):
         """
         This function is 'function zero'.
-        step 1: check all empty cells.
-        step 2: If any empty cell has only one possible value, then set that value.
+        It implements single candidate (naked single) and single position (hidden single) methods,
+        as constraint propagation driven by the work queue of changed cells.
+        step 1: Take a changed cell from the queue.
+                If it has only one possible value, then set that value.
+                Setting the value removes it from the peers, and the changed peers are queued.
+        step 2: When the queue is empty, check only the regions of the changed cells.
+                If any digit is possible in only one cell of the region, then set that value.
+        So the work per placed digit is proportional to its 20 peers, not to all 81 cells.
+        Contradiction is raised as soon as an empty cell has no possible value,
+        or a digit has no possible cell in a checked region.
         Parameters:
             None
         Returns:
             If all empty cells are filled, then returns ZERO_TO_OK
             If further progress is not possible then return ZERO_TO_ONE
         """
-        prevSize = 0
+        options = self.options
+        changed = self.changed
+        digitPos = self.digitPos
+        cellUnits = self.cellUnits
+        unitCells = self.unitCells
+        digitBit = self.digitBit
+        lowestDigit = self.lowestDigit
+        output = self.output
+        emptyCode = self.digitCode[0]
+        listPlaced = (self.listRow, self.listCol, self.listBlock)
+        digits = range(1, self.size + 1)
+        setDirtyUnit = set()
         self.strOutput = ''
 
-        while True:
-
-            for cellIndex, bitmap in self.options.copy().items():
-
-                if bin(bitmap).count('1') == 1:
-                    # Store final answer in output dictionary
-                    self.output[cellIndex] = ClassicSudoku.bitMap2char[bitmap]
-                    # Reset the value in options dictionary
-                    # update all bitmaps accordingly
-                    rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                    colIndex = ClassicSudoku.GetColIndex(cellIndex)
-                    blockIndex = ClassicSudoku.GetBlockIndex(colIndex, rowIndex)
-                    self.listRow[rowIndex] |= bitmap
-                    self.listCol[colIndex] |= bitmap
-                    self.listBlock[blockIndex] |= bitmap
-
-                    for k in self.options:
-                        r = ClassicSudoku.GetRowIndex(k)
-                        c = ClassicSudoku.GetColIndex(k)
-                        b = ClassicSudoku.GetBlockIndex(c, r)
-                        if r == rowIndex:
-                            self.options[k] = self.options[k] & (ClassicSudoku.invert - bitmap)
-                        if c == colIndex:
-                            self.options[k] = self.options[k] & (ClassicSudoku.invert - bitmap)
-                        if b == blockIndex:
-                            self.options[k] = self.options[k] & (ClassicSudoku.invert - bitmap)
-
-                if self.options[cellIndex] == 0:
-                    del self.options[cellIndex]
-
-            size = len(self.output)
-
-            # Sudoku puzzle is solved.
-            # As the options dictionary is empty.
-            # So break the outer Do-while loop
-            if len(self.options) == 0:
-                break
-
-            # The size of output dictionary is not increasing.
-            # This is more complex Sudoku puzzle.
-            # So call next function
-            if size == prevSize:
-                print("ZERO_TO_ONE output size %d"%(size))
-                return ClassicSudoku.ZERO_TO_ONE
-
-            # Reset for next iteration within do-while loop
-            prevSize = size
-
-        listInput = list(self.strInput)
-        for cellIndex, value in enumerate(listInput):
-            if value == '0':
-                value = self.output[cellIndex]
-                listInput[cellIndex] = value
-
-        self.strOutput = ''.join(listInput)
+        while changed:
+
+            while changed:
+                cellIndex = changed.pop()
+                bitmap = options[cellIndex]
+                if bitmap == 0:
+                    if output[cellIndex] == emptyCode:
+                        raise Contradiction("Cell in row %d, column %d has no possible value"
+                                            % (self.cellRow[cellIndex] + 1, self.cellCol[cellIndex] + 1))
+                    continue
+                if bitmap & (bitmap - 1) == 0:
+                    # Single candidate
+                    self.PlaceDigit(cellIndex, bitmap)
+                setDirtyUnit.update(cellUnits[cellIndex])
+
+            for unitIndex in setDirtyUnit:
+                # Digits possible in exactly one cell of the region
+                unitBase = unitIndex * (self.size + 1)
+                placed = listPlaced[unitIndex // self.size][unitIndex % self.size]
+                for digit in digits:
+                    positions = digitPos[unitBase + digit]
+                    if not positions:
+                        if not placed & digitBit[digit]:
+                            raise Contradiction("Digit %s has no possible cell in region %d" % (self.symbols[digit], unitIndex))
+                    elif positions & (positions - 1) == 0:
+                        cellIndex = unitCells[unitIndex][lowestDigit[positions] - 1]
+                        if options[cellIndex] != digitBit[digit]:
+                            self.SetOptions(cellIndex, digitBit[digit])
+                        else:
+                            changed.add(cellIndex)
+            setDirtyUnit.clear()
+
+        # The number of filled cells is not increasing.
+        # This is more complex Sudoku puzzle.
+        # So call next function
+        if self.GetSolvedCount() != self.cellCount:
+            return ClassicSudoku.ZERO_TO_ONE
+
+        self.strOutput = self.output.decode('ascii')
 
-        print("ZERO_TO_OK output size %d" % (size))
         return ClassicSudoku.ZERO_TO_OK
 
     def ExplicitRegionSolveARegion(self, listCellIndexInRegion):
@@ -209,12 +824,13 @@ class ClassicSudoku(Sudoku):
         """
 
         dictCellIndexInRegion = {cellIndex: self.options[cellIndex] for cellIndex in listCellIndexInRegion}
-        listTupleKV = sorted(dictCellIndexInRegion.items(), key=lambda x: bin(x[1]).count('1'), reverse=True)
+        bitCount = self.bitCount
+        listTupleKV = sorted(dictCellIndexInRegion.items(), key=lambda x: bitCount[x[1]], reverse=True)
         listSubSetCellIndex = []
         status = 0
 
         for i in range(len(listTupleKV)):
-            maxValueCount = bin(listTupleKV[i][1]).count('1')
+            maxValueCount = bitCount[listTupleKV[i][1]]
             if maxValueCount == 0:
                 break
             maxValueCellIndex = listTupleKV[i][0]
@@ -231,11 +847,11 @@ class ClassicSudoku(Sudoku):
                 for cellIndex in listCellIndexInRegion:
                     if cellIndex not in listSubSetCellIndex:
                         # Reset bit
-                        temp = self.options[cellIndex] & (ClassicSudoku.invert - listTupleKV[i][1])
+                        temp = self.options[cellIndex] & (self.invert - listTupleKV[i][1])
                         # Check, the candidate list is modified or not.
                         if ( self.options[cellIndex] != temp):
                             status = 1
-                            self.options[cellIndex] = temp
+                            self.SetOptions(cellIndex, temp)
 
         return status
 
@@ -255,93 +871,53 @@ class ClassicSudoku(Sudoku):
             If any progress made then ONE_BACKTO_ZERO
             If further progress is not possible then return ONE_TO_TWO
         """
-        listCellIndexInRegion = []
         status = 0
 
-        for rowIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                if rowIndex == ClassicSudoku.GetRowIndex(cellIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.ExplicitRegionSolveARegion(listCellIndexInRegion)
-
-        for colIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                if colIndex == ClassicSudoku.GetColIndex(cellIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.ExplicitRegionSolveARegion(listCellIndexInRegion)
-
-        for blockIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                colIndex = ClassicSudoku.GetColIndex(cellIndex)
-                if blockIndex == ClassicSudoku.GetBlockIndex(colIndex, rowIndex):
-                    listCellIndexInRegion.append(cellIndex)
+        for unitIndex in self.GetDirtyUnits('SolveExplicitRegion'):
+            listCellIndexInRegion = [cellIndex for cellIndex in self.unitCells[unitIndex] if self.options[cellIndex]]
             if listCellIndexInRegion:
                 status = status | self.ExplicitRegionSolveARegion(listCellIndexInRegion)
 
         if status == 0:
-            print("ONE_TO_TWO output size %d" % (len(self.output)))
             return ClassicSudoku.ONE_TO_TWO
         else:
-            print("ONE_BACKTO_ZERO output size %d" % (len(self.output)))
             # self.PrintOptions()
             return ClassicSudoku.ONE_BACKTO_ZERO
 
-    def ImplicitRegionSolveARegion(self, listCellIndexInRegion):
+    def ImplicitRegionSolveARegion(self, unitIndex):
         """
         This function is a helper function for 'function two'.
+        The cells of a digit are read from digitPos, as bitmap of positions in the region.
         Parameters:
-            List of all cellIndex for any given one region = row | column | block
+            unitIndex of the region = row | column | block, see unitCells
         Returns:
             If possible values at any empty cell is modified, then returns status as 1
             If further progress is not possible then return status as 0
         """
-        dictCellIndexInRegion = {cellIndex: self.options[cellIndex] for cellIndex in listCellIndexInRegion}
-        dicDigit = {digit: [] for digit in range(1, ClassicSudoku.size + 1)}
-
-        for digit in dicDigit:
-            for cellIndex, value in dictCellIndexInRegion.items():
-                if value == (value | ClassicSudoku.char2BitMap[str(digit)]):
-                    dicDigit[digit].append(cellIndex)
-
-        listTupleKV = sorted(dicDigit.items(), key=lambda x: len(x[1]), reverse=True)
-        listSubSetDigit = []
+        digitPos = self.digitPos
+        digitBit = self.digitBit
+        bitCount = self.bitCount
+        unitBase = unitIndex * (self.size + 1)
+        listDigitPositions = [(digit, digitPos[unitBase + digit]) for digit in range(1, self.size + 1)
+                              if digitPos[unitBase + digit]]
         status = 0
 
-        for i in range(ClassicSudoku.size):
-            keyCount = len(listTupleKV[i][1])
-            if keyCount == 0:
-                break
-            digitWithmaxNoOfKey = listTupleKV[i][0]
-            count = 1
-            listSubSetDigit.clear()
-            listSubSetDigit.append(digitWithmaxNoOfKey)
-            for j in range(i + 1, ClassicSudoku.size):
-                if not listTupleKV[j][1]:
-                    break
-                if all(x in listTupleKV[i][1] for x in listTupleKV[j][1]):
-                    count = count + 1
-                    listSubSetDigit.append(listTupleKV[j][0])
-            if count == keyCount:
-                for cellIndex in listCellIndexInRegion:
-                    for digit in range(1, ClassicSudoku.size + 1):
-                        if (
-                                ((cellIndex not in listTupleKV[i][1]) and (digit in listSubSetDigit))
-                                or
-                                ((cellIndex in listTupleKV[i][1]) and (digit not in listSubSetDigit))
-                        ):
-                            # Reset bit
-                            temp = self.options[cellIndex] & (ClassicSudoku.invert -
-                                                              ClassicSudoku.char2BitMap[str(digit)])
-                            # Check, the candidate list is modified or not.
-                            if (self.options[cellIndex] != temp):
-                                status = 1
-                                self.options[cellIndex] = temp
+        for digit, positions in listDigitPositions:
+            # Digits, whose cells are subset of cells of this digit
+            subSetDigits = 0
+            for otherDigit, otherPositions in listDigitPositions:
+                if otherPositions & ~positions == 0:
+                    subSetDigits |= digitBit[otherDigit]
+            if bitCount[subSetDigits] == bitCount[positions]:
+                # N digits in N cells: other digits are absent in those cells.
+                # Those digits are already absent in rest of the cells.
+                for position in self.bitDigits[positions]:
+                    cellIndex = self.unitCells[unitIndex][position - 1]
+                    temp = self.options[cellIndex] & subSetDigits
+                    # Check, the candidate list is modified or not.
+                    if (self.options[cellIndex] != temp):
+                        status = 1
+                        self.SetOptions(cellIndex, temp)
         return status
 
     def SolveImplicitRegion(self):
@@ -349,7 +925,7 @@ class ClassicSudoku(Sudoku):
         This function is 'function two'
         It implements hidden pair, hidden triple and hidden tuple methods
         step 1: check all Regions = all Rows, all Columns and all Blocks
-        step 2: Create a reverse map of digit values v/s cellIndex in region.
+        step 2: Take map of digit values v/s cells in region from digitPos.
         step 3: If number of digit value = 1, number of possible cells = N
                 And
                 number of digit value = N - 1, number of possible cells are subset of N
@@ -361,92 +937,61 @@ class ClassicSudoku(Sudoku):
             If any progress made then TWO_BACKTO_ZERO
             If further progress is not possible then return TWO_TO_THREE
         """
-        listCellIndexInRegion = []
         status = 0
 
-        for rowIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                if rowIndex == ClassicSudoku.GetRowIndex(cellIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.ImplicitRegionSolveARegion(listCellIndexInRegion)
-
-        for colIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                if colIndex == ClassicSudoku.GetColIndex(cellIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.ImplicitRegionSolveARegion(listCellIndexInRegion)
-
-        for blockIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                colIndex = ClassicSudoku.GetColIndex(cellIndex)
-                if blockIndex == ClassicSudoku.GetBlockIndex(colIndex, rowIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.ImplicitRegionSolveARegion(listCellIndexInRegion)
+        for unitIndex in self.GetDirtyUnits('SolveImplicitRegion'):
+            status = status | self.ImplicitRegionSolveARegion(unitIndex)
 
         if status == 0:
-            print("TWO_TO_THREE output size %d" % (len(self.output)))
             return ClassicSudoku.TWO_TO_THREE
         else:
-            print("TWO_BACKTO_ZERO output size %d" % (len(self.output)))
             # self.PrintOptions()
             return ClassicSudoku.TWO_BACKTO_ZERO
 
-    def CandidateLineTechniqueSolveARegion(self, listCellIndexInRegion):
+    def CandidateLineTechniqueSolveARegion(self, blockIndex):
         """
         This function is a helper function for 'function three'.
+        The cells of a digit are read from digitPos, as bitmap of positions in the block.
         Parameters:
-            List of all cellIndex for any given one region = row | column | block
+            blockIndex
         Returns:
             If possible values at any empty cell is modified, then returns status as 1
             If further progress is not possible then return status as 0
         """
-        dictCellIndexInRegion = {cellIndex: self.options[cellIndex] for cellIndex in listCellIndexInRegion}
-        dicDigit = {digit: [] for digit in range(1, ClassicSudoku.size + 1)}
+        digitPos = self.digitPos
+        unitIndex = 2 * self.size + blockIndex
+        unitBase = unitIndex * (self.size + 1)
+        status = 0
+        for digit in range(1, self.size + 1):
+            positions = digitPos[unitBase + digit]
+            if not positions:
+                continue
+            for lineIndex in range(self.sqrt_size):
 
-        for digit in dicDigit:
-            for cellIndex, value in dictCellIndexInRegion.items():
-                if value == (value | ClassicSudoku.char2BitMap[str(digit)]):
-                    dicDigit[digit].append(cellIndex)
+                if positions & ~self.blockColMasks[lineIndex] == 0:
+                    colIndex = self.cellCol[self.unitCells[unitIndex][lineIndex]]
+                    status = status | self.CandidateLineEliminate(self.size + colIndex, blockIndex, digit)
 
-        status = 0
-        for digit, listCellIndex in dicDigit.items():
-            if listCellIndex:
-
-                if all(x % ClassicSudoku.size == listCellIndex[0] % ClassicSudoku.size for x in listCellIndex):
-                    colIndex = ClassicSudoku.GetColIndex(listCellIndex[0])
-                    for cellIndex in self.options:
-                        if cellIndex not in listCellIndex:
-                            c = ClassicSudoku.GetColIndex(cellIndex)
-                            if c == colIndex:
-                                # Reset bit
-                                temp = self.options[cellIndex] & (ClassicSudoku.invert -
-                                                                  ClassicSudoku.char2BitMap[str(digit)])
-                                # Check, the candidate list is modified or not.
-                                if (self.options[cellIndex] != temp):
-                                    status = 1
-                                    self.options[cellIndex] = temp
-
-                if all(x // ClassicSudoku.size == listCellIndex[0] // ClassicSudoku.size for x in listCellIndex):
-                    rowIndex = ClassicSudoku.GetRowIndex(listCellIndex[0])
-                    for cellIndex in self.options:
-                        if cellIndex not in listCellIndex:
-                            r = ClassicSudoku.GetRowIndex(cellIndex)
-                            if r == rowIndex:
-                                # Reset bit
-                                temp = self.options[cellIndex] & (ClassicSudoku.invert -
-                                                                  ClassicSudoku.char2BitMap[str(digit)])
-                                # Check, the candidate list is modified or not.
-                                if (self.options[cellIndex] != temp):
-                                    status = 1
-                                    self.options[cellIndex] = temp
+                if positions & ~self.blockRowMasks[lineIndex] == 0:
+                    rowIndex = self.cellRow[self.unitCells[unitIndex][lineIndex * self.sqrt_size]]
+                    status = status | self.CandidateLineEliminate(rowIndex, blockIndex, digit)
+
+        return status
 
+    def CandidateLineEliminate(self, lineUnitIndex, blockIndex, digit):
+        """
+        This function removes digit from cells of the line outside of the block.
+        Returns:
+            If possible values at any empty cell is modified, then returns status as 1
+        """
+        status = 0
+        unitCells = self.unitCells[lineUnitIndex]
+        for position in self.bitDigits[self.digitPos[lineUnitIndex * (self.size + 1) + digit]]:
+            cellIndex = unitCells[position - 1]
+            if self.cellBlock[cellIndex] != blockIndex:
+                # Reset bit
+                status = 1
+                self.SetOptions(cellIndex, self.options[cellIndex] & (self.invert - self.digitBit[digit]))
         return status
 
     def SolveCandidateLineTechnique(self):
@@ -454,7 +999,7 @@ class ClassicSudoku(Sudoku):
         This function is 'function three'
         It implements Single line techniques. Line = Row | Column
         step 1: Iterate through all blocks
-        step 2: Create a reverse map of digit values v/s cellIndex in block.
+        step 2: Take map of digit values v/s cells in block from digitPos.
         step 3: Now for each digit if all cellIndex belongs to same one Line,
                 (that means, cellIndex does not belong to other two lines within block)
                 Then
@@ -465,183 +1010,572 @@ class ClassicSudoku(Sudoku):
             If any progress made then THREE_BACKTO_ZERO
             If further progress is not possible then return THREE_TO_ERROR
         """
-        listCellIndexInRegion = []
         status = 0
 
-        for blockIndex in range(ClassicSudoku.size):
-            listCellIndexInRegion.clear()
-            for cellIndex in self.options:
-                rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                colIndex = ClassicSudoku.GetColIndex(cellIndex)
-                if blockIndex == ClassicSudoku.GetBlockIndex(colIndex, rowIndex):
-                    listCellIndexInRegion.append(cellIndex)
-            if listCellIndexInRegion:
-                status = status | self.CandidateLineTechniqueSolveARegion(listCellIndexInRegion)
+        for unitIndex in self.GetDirtyUnits('SolveCandidateLineTechnique'):
+            if unitIndex >= 2 * self.size:
+                status = status | self.CandidateLineTechniqueSolveARegion(unitIndex - 2 * self.size)
 
         if status == 0:
-            print("THREE_TO_FOUR output size %d" % (len(self.output)))
             return ClassicSudoku.THREE_TO_FOUR
         else:
-            print("THREE_BACKTO_ZERO output size %d" % (len(self.output)))
             # self.PrintOptions()
             return ClassicSudoku.THREE_BACKTO_ZERO
 
-    def MultipleLinesTechniqueSolveARegion(self, listCellIndexInRegion1, listCellIndexInRegion2, cr,
-                                           listCellIndexInRegion3):
+    def MultipleLinesTechniqueSolveARegion(self, listBlockIndex, cr, blockIndex3):
         """
         This function is helper fuctnion for 'function four'.
+        The cells of a digit are read from digitPos, as bitmap of positions in the block.
+        The lines of a block are also kept as bitmap of positions, see blockRowMasks and blockColMasks.
         Parameters:
-            List of all cellIndex for any given block1
-            List of all cellIndex for any given block2
+            List of blockIndex of the other blocks sharing the lines of block3
             Variable cr indicates weather this operation is on column or on row
-            List of all cellIndex for any given block3
+            blockIndex of block3
         Returns:
             If possible values at any empty cell is modified, then returns status as 1
             If further progress is not possible then return status as 0
         """
-
-        # For Block 1
-        dictCellIndexInRegion1 = {cellIndex: self.options[cellIndex] for cellIndex in listCellIndexInRegion1}
-        dicDigit1 = {digit: [] for digit in range(1, ClassicSudoku.size + 1)}
-        for digit in dicDigit1:
-            for cellIndex, value in dictCellIndexInRegion1.items():
-                if value == (value | ClassicSudoku.char2BitMap[str(digit)]):
-                    dicDigit1[digit].append(cellIndex)
-        for digit, listCellIndex in dicDigit1.copy().items():
-            if not listCellIndex:
-                del digit
-        setLineIndex1 = set()
-
-        # For Block 2
-        dictCellIndexInRegion2 = {cellIndex: self.options[cellIndex] for cellIndex in listCellIndexInRegion2}
-        dicDigit2 = {digit: [] for digit in range(1, ClassicSudoku.size + 1)}
-        for digit in dicDigit2:
-            for cellIndex, value in dictCellIndexInRegion2.items():
-                if value == (value | ClassicSudoku.char2BitMap[str(digit)]):
-                    dicDigit2[digit].append(cellIndex)
-        for digit, listCellIndex in dicDigit2.copy().items():
-            if not listCellIndex:
-                del digit
-        setLineIndex2 = set()
-
+        digitPos = self.digitPos
+        lineMasks = self.blockColMasks if cr == 'c' else self.blockRowMasks
+        unitIndex3 = 2 * self.size + blockIndex3
         status = 0
-        for digit, listCellIndex1 in dicDigit1.items():
-            if digit in dicDigit2:
-
-                setLineIndex1.clear()
-                setLineIndex2.clear()
-
-                for cellIndex in listCellIndex1:
-                    if cr == 'c':
-                        setLineIndex1.add(ClassicSudoku.GetColIndex(cellIndex))
-                    else:
-                        setLineIndex1.add(ClassicSudoku.GetRowIndex(cellIndex))
-
-                listCellIndex2 = dicDigit2[digit]
-                for cellIndex in listCellIndex2:
-                    if cr == 'c':
-                        setLineIndex2.add(ClassicSudoku.GetColIndex(cellIndex))
-                    else:
-                        setLineIndex2.add(ClassicSudoku.GetRowIndex(cellIndex))
-
-                if ((len(setLineIndex1) == (ClassicSudoku.sqrt_size - 1)) \
-                        and
-                    (setLineIndex1 == setLineIndex2 )):
-                    if cr == 'c':
-                        for cellIndex in listCellIndexInRegion3:
-                            lineIndex = ClassicSudoku.GetColIndex(cellIndex)
-                            if lineIndex in setLineIndex1:
-                                # Reset bit
-                                temp = self.options[cellIndex] & \
-                                       (ClassicSudoku.invert - ClassicSudoku.char2BitMap[str(digit)])
-                                # Check, the candidate list is modified or not.
-                                if (self.options[cellIndex] != temp):
-                                    status = 1
-                                    self.options[cellIndex] = temp
-                    else:
-                        for cellIndex in listCellIndexInRegion3:
-                            lineIndex = ClassicSudoku.GetRowIndex(cellIndex)
-                            if lineIndex in setLineIndex1:
-                                # Reset bit
-                                temp = self.options[cellIndex] & \
-                                       (ClassicSudoku.invert - ClassicSudoku.char2BitMap[str(digit)])
-                                # Check, the candidate list is modified or not.
-                                if (self.options[cellIndex] != temp):
-                                    status = 1
-                                    self.options[cellIndex] = temp
+        for digit in range(1, self.size + 1):
+            positions3 = digitPos[unitIndex3 * (self.size + 1) + digit]
+            if not positions3:
+                continue
+            # Lines of the digit, when they are same in all the other blocks
+            setLine = None
+            for blockIndex in listBlockIndex:
+                positions = digitPos[(2 * self.size + blockIndex) * (self.size + 1) + digit]
+                lines = 0
+                for lineMask in lineMasks:
+                    if positions & lineMask:
+                        lines |= lineMask
+                if setLine is None:
+                    setLine = lines
+                elif lines != setLine:
+                    setLine = 0
+                    break
+            if setLine and self.bitCount[setLine] == (self.sqrt_size - 1) * self.sqrt_size:
+                for position in self.bitDigits[positions3 & setLine]:
+                    cellIndex = self.unitCells[unitIndex3][position - 1]
+                    # Reset bit
+                    status = 1
+                    self.SetOptions(cellIndex, self.options[cellIndex] & (self.invert - self.digitBit[digit]))
         return status
 
     def SolveMultipleLinesTechnique(self):
         """
         This function is 'function four'
         It implements Multiple lines techniques. Line = Row | Column
-        step 1: Create all 9 blocks as dictionay. key = block number, value = list of all member cells
-        step 2: Iterate through possible tripplet of blocks sharing common Lines
-        step 2: Create two reverse map of digit values v/s cellIndex in for two blocks.
-        step 3: Now for each digit if digit presents in exactly two identical lines two blocks
-                (that means, digit does not belong to other third line in both blocks)
+        step 1: Iterate through all bands (blocks sharing rows) and stacks (blocks sharing columns)
+        step 2: For each block3 of the band, take the other blocks of the band.
+        step 3: Now for each digit if digit presents in exactly same (sqrt_size - 1) lines in all other blocks
+                (that means, digit does not belong to the remaining line in those blocks)
                 Then
-                remove that digit from those two lines in third block.
+                remove that digit from those lines in block3.
         Parameters:
             None
         Returns:
             If any progress made then FOUR_BACK_TO_ZERO
-            If further progress is not possible then return FOUR_TO_ERROR
+            If further progress is not possible then return FOUR_TO_FIVE
         """
-
-        dictCellIndexInBlock = {blockIndex: [] for blockIndex in range(ClassicSudoku.size)}
         status = 0
 
-        for cellIndex in self.options:
-            rowIndex = ClassicSudoku.GetRowIndex(cellIndex)
-            colIndex = ClassicSudoku.GetColIndex(cellIndex)
-            blockIndex = ClassicSudoku.GetBlockIndex(colIndex, rowIndex)
-            dictCellIndexInBlock[blockIndex].append(cellIndex)
-
-        if all(dictCellIndexInBlock[x] for x in [0, 1, 2]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[0], dictCellIndexInBlock[1], 'r', dictCellIndexInBlock[2])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[1], dictCellIndexInBlock[2], 'r', dictCellIndexInBlock[0])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[2], dictCellIndexInBlock[0], 'r', dictCellIndexInBlock[1])
-        if all(dictCellIndexInBlock[x] for x in [3, 4, 5]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[3], dictCellIndexInBlock[4], 'r', dictCellIndexInBlock[5])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[4], dictCellIndexInBlock[5], 'r', dictCellIndexInBlock[3])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[5], dictCellIndexInBlock[3], 'r', dictCellIndexInBlock[4])
-        if all(dictCellIndexInBlock[x] for x in [6, 7, 8]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[6], dictCellIndexInBlock[7], 'r', dictCellIndexInBlock[8])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[7], dictCellIndexInBlock[8], 'r', dictCellIndexInBlock[6])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[8], dictCellIndexInBlock[6], 'r', dictCellIndexInBlock[7])
-        if all(dictCellIndexInBlock[x] for x in [0, 3, 6]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[0], dictCellIndexInBlock[3], 'c', dictCellIndexInBlock[6])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[3], dictCellIndexInBlock[6], 'c', dictCellIndexInBlock[0])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[6], dictCellIndexInBlock[0], 'c', dictCellIndexInBlock[3])
-        if all(dictCellIndexInBlock[x] for x in [1, 4, 7]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[1], dictCellIndexInBlock[4], 'c', dictCellIndexInBlock[7])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[4], dictCellIndexInBlock[7], 'c', dictCellIndexInBlock[1])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[7], dictCellIndexInBlock[1], 'c', dictCellIndexInBlock[4])
-        if all(dictCellIndexInBlock[x] for x in [2, 5, 8]):
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[2], dictCellIndexInBlock[5], 'c', dictCellIndexInBlock[8])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[5], dictCellIndexInBlock[8], 'c', dictCellIndexInBlock[2])
-            status = status | self.MultipleLinesTechniqueSolveARegion(dictCellIndexInBlock[8], dictCellIndexInBlock[2], 'c', dictCellIndexInBlock[5])
+        # Bands and stacks with a changed block
+        setBand = set()
+        for unitIndex in self.GetDirtyUnits('SolveMultipleLinesTechnique'):
+            if unitIndex >= 2 * self.size:
+                blockIndex = unitIndex - 2 * self.size
+                setBand.add(('r', blockIndex // self.sqrt_size))
+                setBand.add(('c', blockIndex % self.sqrt_size))
+
+        for cr, bandIndex in sorted(setBand):
+            if cr == 'r':
+                listBlockIndex = [bandIndex * self.sqrt_size + i for i in range(self.sqrt_size)]
+            else:
+                listBlockIndex = [bandIndex + i * self.sqrt_size for i in range(self.sqrt_size)]
+            for blockIndex3 in listBlockIndex:
+                listOtherBlockIndex = [blockIndex for blockIndex in listBlockIndex if blockIndex != blockIndex3]
+                status = status | self.MultipleLinesTechniqueSolveARegion(listOtherBlockIndex, cr, blockIndex3)
 
         if status == 0:
-            print("FOUR_TO_ERROR output size %d" % (len(self.output)))
             # self.PrintOptions()
-            return ClassicSudoku.FOUR_TO_ERROR
+            return ClassicSudoku.FOUR_TO_FIVE
         else:
-            print("FOUR_BACK_TO_ZERO output size %d" % (len(self.output)))
             # self.PrintOptions()
             return ClassicSudoku.FOUR_BACK_TO_ZERO
 
+    def FishSolveADigit(self, digit, fishSize, baseOffset):
+        """
+        This function is a helper function for the fish techniques.
+        Base lines are rows (baseOffset = 0) or columns (baseOffset = size). The other kind of lines are cover lines.
+        The cells of the digit in a line are read from digitPos, as bitmap of positions in the line.
+        Position of a cell in a row is its column + 1, and position of a cell in a column is its row + 1.
+        Parameters:
+            digit
+            fishSize: 2 for X-Wing, 3 for Swordfish
+            baseOffset: unitIndex of first base line
+        Returns:
+            If possible values at any empty cell is modified, then returns status as 1
+            If further progress is not possible then return status as 0
+        """
+        digitPos = self.digitPos
+        bitCount = self.bitCount
+        unitSize = self.size + 1
+        coverOffset = self.size - baseOffset
+        listBase = []
+        for lineIndex in range(self.size):
+            positions = digitPos[(baseOffset + lineIndex) * unitSize + digit]
+            if 2 <= bitCount[positions] <= fishSize:
+                listBase.append((lineIndex, positions))
+        status = 0
+
+        for listFish in itertools.combinations(listBase, fishSize):
+            coverPositions = 0
+            basePositions = 0
+            for lineIndex, positions in listFish:
+                coverPositions |= positions
+                basePositions |= 1 << (lineIndex + 1)
+            if bitCount[coverPositions] != fishSize:
+                continue
+            # The digit is in the cover lines within the base lines only. Remove it from rest of the cover lines.
+            for position in self.bitDigits[coverPositions]:
+                coverUnitIndex = coverOffset + position - 1
+                unitCells = self.unitCells[coverUnitIndex]
+                for otherPosition in self.bitDigits[digitPos[coverUnitIndex * unitSize + digit] & ~basePositions]:
+                    cellIndex = unitCells[otherPosition - 1]
+                    # Reset bit
+                    status = 1
+                    self.SetOptions(cellIndex, self.options[cellIndex] & (self.invert - self.digitBit[digit]))
+        return status
+
+    def SolveFish(self, technique, fishSize):
+        """
+        This function checks fish of fishSize for all digits, with rows as base lines and then with columns.
+        Nothing is checked, if no region has changed since last run of the technique.
+        Returns:
+            If possible values at any empty cell is modified, then returns status as 1
+        """
+        status = 0
+        if not self.GetDirtyUnits(technique):
+            return status
+        for baseOffset in (0, self.size):
+            for digit in range(1, self.size + 1):
+                status = status | self.FishSolveADigit(digit, fishSize, baseOffset)
+        return status
+
+    def SolveXWingTechnique(self):
+        """
+        This function is an advanced technique, tried after 'function four'.
+        It implements X-Wing
+        step 1: For each digit, take the rows, where the digit is possible in exactly two cells.
+        step 2: If two such rows have the digit in the same two columns
+                Then
+                the digit is in those columns within these two rows only. Remove it from rest of the two columns.
+        step 3: Repeat with columns in place of rows.
+        Parameters:
+            None
+        Returns:
+            If any progress made then XWING_BACKTO_ZERO
+            If further progress is not possible then return XWING_TO_NEXT
+        """
+        if self.SolveFish('SolveXWingTechnique', 2) == 0:
+            return ClassicSudoku.XWING_TO_NEXT
+        else:
+            return ClassicSudoku.XWING_BACKTO_ZERO
+
+    def SolveSwordfishTechnique(self):
+        """
+        This function is an advanced technique, tried after X-Wing.
+        It implements Swordfish. Same as X-Wing with three rows, where the digit is possible
+        in two or three cells, and all these cells are in the same three columns.
+        Parameters:
+            None
+        Returns:
+            If any progress made then SWORDFISH_BACKTO_ZERO
+            If further progress is not possible then return SWORDFISH_TO_NEXT
+        """
+        if self.SolveFish('SolveSwordfishTechnique', 3) == 0:
+            return ClassicSudoku.SWORDFISH_TO_NEXT
+        else:
+            return ClassicSudoku.SWORDFISH_BACKTO_ZERO
+
+    def SolveXYWingTechnique(self):
+        """
+        This function is an advanced technique, tried after Swordfish.
+        It implements XY-Wing
+        step 1: Take pivot cell with two possible values XY.
+        step 2: Take two peers of the pivot (pincers) with possible values XZ and YZ.
+        step 3: Whatever is the value of pivot, one of the pincers is Z.
+                So remove Z from all cells, which are peers of both pincers.
+        Parameters:
+            None
+        Returns:
+            If any progress made then XYWING_BACKTO_ZERO
+            If further progress is not possible then return XYWING_TO_NEXT
+        """
+        status = 0
+        if self.GetDirtyUnits('SolveXYWingTechnique'):
+            options = self.options
+            bitCount = self.bitCount
+            for pivot in range(self.cellCount):
+                xy = options[pivot]
+                if bitCount[xy] != 2:
+                    continue
+                # Peers with two possible values, one of them common with pivot
+                listPincer = [cellIndex for cellIndex in self.cellPeers[pivot]
+                              if bitCount[options[cellIndex]] == 2 and bitCount[options[cellIndex] & xy] == 1]
+                for pincer1, pincer2 in itertools.combinations(listPincer, 2):
+                    xz = options[pincer1]
+                    yz = options[pincer2]
+                    z = xz & yz
+                    if bitCount[xz] != 2 or bitCount[yz] != 2 or bitCount[z] != 1 or z & xy or (xz | yz) & xy != xy:
+                        continue
+                    for cellIndex in set(self.cellPeers[pincer1]).intersection(self.cellPeers[pincer2]):
+                        if options[cellIndex] & z:
+                            # Reset bit
+                            status = 1
+                            self.SetOptions(cellIndex, options[cellIndex] & ~z)
+
+        if status == 0:
+            return ClassicSudoku.XYWING_TO_NEXT
+        else:
+            return ClassicSudoku.XYWING_BACKTO_ZERO
+
+    def SimpleColoringSolveADigit(self, digit):
+        """
+        This function is a helper function for simple coloring.
+        Parameters:
+            digit
+        Returns:
+            If possible values at any empty cell is modified, then returns status as 1
+            If further progress is not possible then return status as 0
+        """
+        digitPos = self.digitPos
+        unitSize = self.size + 1
+        bitmap = self.digitBit[digit]
+        # Conjugate pairs: the digit is possible in exactly two cells of a region
+        dictLink = {}
+        for unitIndex in range(len(self.unitCells)):
+            positions = digitPos[unitIndex * unitSize + digit]
+            if self.bitCount[positions] == 2:
+                cellIndex1, cellIndex2 = (self.unitCells[unitIndex][position - 1] for position in self.bitDigits[positions])
+                dictLink.setdefault(cellIndex1, []).append(cellIndex2)
+                dictLink.setdefault(cellIndex2, []).append(cellIndex1)
+
+        status = 0
+        colored = set()
+        for start in dictLink:
+            if start in colored:
+                continue
+            # Color the chain of conjugate pairs with two alternating colors
+            listColor = ([start], [])
+            dictColor = {start: 0}
+            queue = [start]
+            while queue:
+                cellIndex = queue.pop()
+                for other in dictLink[cellIndex]:
+                    if other not in dictColor:
+                        dictColor[other] = 1 - dictColor[cellIndex]
+                        listColor[dictColor[other]].append(other)
+                        queue.append(other)
+            colored.update(dictColor)
+
+            listPeers = []
+            for color in (0, 1):
+                peers = set()
+                for cellIndex in listColor[color]:
+                    peers.update(self.cellPeers[cellIndex])
+                listPeers.append(peers)
+
+            # Color wrap: two cells of same color in a region. The digit is not in cells of that color.
+            for color in (0, 1):
+                if not listPeers[color].isdisjoint(listColor[color]):
+                    for cellIndex in listColor[color]:
+                        if self.options[cellIndex] & bitmap:
+                            status = 1
+                            self.SetOptions(cellIndex, self.options[cellIndex] & ~bitmap)
+                    return status
+
+            # Color trap: the digit is in one of the colors. Remove it from cells, which are peers of both colors.
+            for cellIndex in listPeers[0] & listPeers[1]:
+                if cellIndex not in dictColor and self.options[cellIndex] & bitmap:
+                    status = 1
+                    self.SetOptions(cellIndex, self.options[cellIndex] & ~bitmap)
+        return status
+
+    def SolveSimpleColoringTechnique(self):
+        """
+        This function is an advanced technique, tried after XY-Wing.
+        It implements simple coloring (single digit chains)
+        step 1: For each digit, link the two cells of every region, where the digit is possible in exactly two cells.
+        step 2: Color the cells of each chain of links alternately. The digit is in all cells of one of the colors.
+        step 3: If two cells of same color share a region, then remove the digit from all cells of that color.
+                Else remove the digit from the cells outside the chain, which are peers of both colors.
+        Parameters:
+            None
+        Returns:
+            If any progress made then COLORING_BACKTO_ZERO
+            If further progress is not possible then return COLORING_TO_NEXT
+        """
+        status = 0
+        if self.GetDirtyUnits('SolveSimpleColoringTechnique'):
+            for digit in range(1, self.size + 1):
+                status = status | self.SimpleColoringSolveADigit(digit)
+
+        if status == 0:
+            return ClassicSudoku.COLORING_TO_NEXT
+        else:
+            return ClassicSudoku.COLORING_BACKTO_ZERO
+
+    def IsConsistent(self):
+        """
+        This function checks the board for contradiction: an empty cell without candidate values,
+        or a digit which is neither placed nor possible in a region.
+        """
+        emptyCode = self.digitCode[0]
+        for cellIndex in range(self.cellCount):
+            if self.options[cellIndex] == 0 and self.output[cellIndex] == emptyCode:
+                return False
+        listPlaced = self.listRow + self.listCol + self.listBlock
+        for unitIndex in range(len(self.unitCells)):
+            unitBase = unitIndex * (self.size + 1)
+            placed = listPlaced[unitIndex]
+            for digit in range(1, self.size + 1):
+                if not self.digitPos[unitBase + digit] and not placed & self.digitBit[digit]:
+                    return False
+        return True
+
+    def SearchSolutions(self, limit=1):
+        """
+        This function is a helper function for 'function five'.
+        It implements depth first search on the candidate bitmaps, which are already reduced by the other
+        functions. Every guess is followed by propagation:
+        step 1: 'function zero', and from strongSearchNodes guesses on the searchTechniques (functions one to three),
+                until none makes progress.
+        step 2: From strongSearchNodes guesses on, every candidate of a cell with two candidates is tried
+                by ProbeBivalueCells, and the ones which lead to contradiction are removed. Then back to step 1.
+        step 3: Guess the values of the empty cell with fewest candidates. Among those cells the one with
+                most empty peers is chosen, as its guess reduces most candidates.
+        So a wrong guess is found near the top of the search tree, instead of after many guesses in other
+        parts of the board. The board is restored after the search.
+        Parameters:
+            limit: search stops as soon as this many solutions are found
+        Returns:
+            Tuple of (number of solutions found, at most limit ; output array of first solution or None)
+        """
+        found = []
+        nodes = [0]
+        propagation = []
+
+        def Search():
+            nodes[0] += 1
+            if nodes[0] == self.strongSearchNodes:
+                propagation.extend(getattr(type(self), name) for name in self.searchTechniques)
+            # Every node propagates the whole board, so the deadline is checked at every node
+            self.CheckDeadline()
+            try:
+                while True:
+                    while self.SolveSingleCandidate() != ClassicSudoku.ZERO_TO_OK:
+                        for technique in propagation:
+                            clock = self.clock
+                            technique(self)
+                            if self.clock != clock:
+                                break
+                        else:
+                            break
+                    else:
+                        found.append(self.output[:])
+                        return len(found) >= limit
+                    if nodes[0] < self.strongSearchNodes or not self.ProbeBivalueCells():
+                        break
+            except Contradiction:
+                return False
+
+            # Minimum remaining values: choose the empty cell with fewest candidates, then most empty peers
+            options = self.options
+            bitCount = self.bitCount
+            bestCount = self.size + 1
+            listCandidate = []
+            for cellIndex in range(self.cellCount):
+                if options[cellIndex]:
+                    count = bitCount[options[cellIndex]]
+                    if count < bestCount:
+                        bestCount = count
+                        listCandidate = [cellIndex]
+                    elif count == bestCount:
+                        listCandidate.append(cellIndex)
+            bestIndex = max(listCandidate, key=lambda cellIndex: sum(1 for k in self.cellPeers[cellIndex] if options[k]))
+
+            snapshot = self.Snapshot()
+            for digit in self.bitDigits[options[bestIndex]]:
+                # The guess is queued as single candidate, so that 'function zero' checks its regions
+                self.SetOptions(bestIndex, self.digitBit[digit])
+                if Search():
+                    return True
+                self.Restore(snapshot)
+            return False
+
+        snapshot = self.Snapshot()
+        eliminated = self.eliminated
+        try:
+            if self.IsConsistent():
+                Search()
+        finally:
+            self.Restore(snapshot)
+            self.eliminated = eliminated
+            self.strOutput = ''
+        if not found:
+            return 0, None
+        return len(found), found[0]
+
+    def ProbeBivalueCells(self):
+        """
+        This function is a helper function for SearchSolutions.
+        It implements failed candidate probing: each candidate of every cell with two candidates is set,
+        followed by 'function zero'. If that leads to contradiction, then the other candidate is the value
+        of the cell. The board is restored after every probe.
+        Parameters:
+            None
+        Returns:
+            True if any candidate value is removed, else False
+        Raises:
+            Contradiction, if the removals lead to contradiction
+        """
+        options = self.options
+        bitCount = self.bitCount
+        progress = False
+        for cellIndex in range(self.cellCount):
+            bitmap = options[cellIndex]
+            if not bitmap or bitCount[bitmap] != 2:
+                continue
+            for digit in self.bitDigits[bitmap]:
+                snapshot = self.Snapshot()
+                self.SetOptions(cellIndex, self.digitBit[digit])
+                try:
+                    self.SolveSingleCandidate()
+                    failed = False
+                except Contradiction:
+                    failed = True
+                self.Restore(snapshot)
+                if failed:
+                    self.SetOptions(cellIndex, bitmap ^ self.digitBit[digit])
+                    progress = True
+                    if self.SolveSingleCandidate() == ClassicSudoku.ZERO_TO_OK:
+                        return True
+                    break
+        return progress
+
+    def CountSolutions(self, limit=2):
+        """
+        This function counts solutions of the loaded puzzle, without solving it.
+        A valid Sudoku puzzle has exactly one solution.
+        Parameters:
+            limit: counting stops as soon as this many solutions are found
+        Returns:
+            Number of solutions, at most limit
+        """
+        count, output = self.SearchSolutions(limit)
+        return count
+
+    def SolveBySearch(self):
+        """
+        This function is 'function five'
+        It is invoked only when none of the logical techniques makes progress.
+        step 1: Search the remaining candidates with SearchSolutions
+        step 2: If a solution is found, then fill all empty cells with it.
+        Parameters:
+            None
+        Returns:
+            If puzzle is solved then FIVE_TO_OK
+            If puzzle has no solution then FIVE_TO_ERROR
+        """
+        count, output = self.SearchSolutions(1)
+        if count == 0:
+            return ClassicSudoku.FIVE_TO_ERROR
+
+        for cellIndex in range(self.cellCount):
+            if self.output[cellIndex] != output[cellIndex]:
+                bitmap = self.codeBit[output[cellIndex]]
+                self.listRow[self.cellRow[cellIndex]] |= bitmap
+                self.listCol[self.cellCol[cellIndex]] |= bitmap
+                self.listBlock[self.cellBlock[cellIndex]] |= bitmap
+            self.options[cellIndex] = 0
+        self.output[:] = output
+        self.changed.clear()
+        self.BuildDigitPositions()
+        self.strOutput = self.output.decode('ascii')
+
+        return ClassicSudoku.FIVE_TO_OK
+
     def PrintOptions(self):
         """
         This function is just for debugging. It can invoked after state change to monitor progress.
         Parameters : none
         Returns : none
         """
-        for cellIndex, value in self.options.items():
+        for cellIndex in self.GetEmptyCells():
+            value = self.options[cellIndex]
             print("%d : " %(cellIndex), end=" ")
-            for digit in range(1, ClassicSudoku.size + 1):
-                if value == (value | ClassicSudoku.char2BitMap[str(digit)]):
-                    print(digit, end=" ")
+            for digit in self.bitDigits[value]:
+                print(digit, end=" ")
             print("\r")
         print("=====================================================")
+
+
+ClassicSudoku.BuildIndexTables()
+
+
+class GenericSudoku(ClassicSudoku):
+    """
+    Sudoku of any size N x N, where N is a square number: 4 x 4, 9 x 9, 16 x 16, 25 x 25.
+    Usage:
+        s = GenericSudoku(16)
+        s.Load(strInput)
+        s.Solve()
+    Digits 1 to 9 are written as '1' to '9', and digits above 9 as 'A', 'B', 'C' ... ; '0' is empty cell.
+    The same algorithms of ClassicSudoku are used. Each size has its own subclass, whose index tables
+    and bit tables are computed once, on first use of that size.
+    """
+    __slots__ = ()
+
+    allSymbols = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    # size -> subclass of GenericSudoku for that size
+    sizeClasses = {}
+
+    def __new__(cls, size=None):
+        return object.__new__(cls.ForSize(cls.size if size is None else size))
+
+    def __init__(self, size=None):
+        super().__init__()
+
+    @classmethod
+    def ForSize(cls, size):
+        """
+        This function returns the subclass for given size, with its tables.
+        Parameters:
+            size: number of cells in a row, square number up to 25
+        Returns:
+            Subclass of GenericSudoku
+        """
+        sizeClass = GenericSudoku.sizeClasses.get(size)
+        if sizeClass is None:
+            sqrt_size = int(round(size ** 0.5))
+            if sqrt_size < 2 or sqrt_size * sqrt_size != size or size >= len(GenericSudoku.allSymbols):
+                raise ValueError("size must be a square number from 4 to %d" % (len(GenericSudoku.allSymbols) - 1))
+            symbols = GenericSudoku.allSymbols[:size + 1]
+            sizeClass = type('Sudoku%dx%d' % (size, size), (GenericSudoku,), {
+                '__slots__': (),
+                'size': size,
+                'sqrt_size': sqrt_size,
+                'invert': (1 << (size + 1)) - 2,
+                'symbols': symbols,
+                'typecode': 'H' if size < 16 else 'L',
+                'stateTypecode': 'H' if size < 16 else 'I',
+                'char2BitMap': {symbol: (1 << digit) if digit else 0 for digit, symbol in enumerate(symbols)},
+                'bitMap2char': {1 << digit: symbol for digit, symbol in enumerate(symbols) if digit},
+            })
+            sizeClass.BuildIndexTables()
+            GenericSudoku.sizeClasses[size] = sizeClass
+        return sizeClass
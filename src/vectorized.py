@@ -0,0 +1,202 @@
+"""
+Vectorized batch solver for many 9 x 9 Sudoku puzzles at once, using NumPy.
+
+N puzzles are held as (N, 9, 9) array of candidate bitmaps, with same bit layout as
+ClassicSudoku.options ( digit d is bit 1 << d ). The basic techniques are applied to all
+puzzles at once with array operations:
+    naked single  : value of filled cell is removed from its 20 peers
+    hidden single : digit possible in only one cell of a region is set in that cell
+    box-line      : digit confined to one line of a block is removed from rest of the line,
+                    and digit confined to one block of a line is removed from rest of the block
+The puzzles not solved by these techniques are handed over to ClassicSudoku.
+
+NumPy is an optional dependency. It is needed only for this module.
+"""
+from sudoku import ClassicSudoku, InvalidPuzzle
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class BatchSudoku:
+    """
+    Batch solver. Usage:
+        solver = BatchSudoku()
+        listOutput = solver.SolveBatch(listInput)
+    """
+
+    # Number of rounds of vectorized techniques, before falling back to ClassicSudoku
+    maxRounds = 50
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("BatchSudoku needs NumPy. Please install it with: pip install numpy")
+        size = ClassicSudoku.size
+        # Bitmap -> digit, for bitmaps with single bit set
+        self.bitMap2digit = np.zeros(ClassicSudoku.invert + 2, dtype=np.uint8)
+        for digit in range(1, size + 1):
+            self.bitMap2digit[1 << digit] = digit
+        self.digit2BitMap = np.array([0] + [1 << digit for digit in range(1, size + 1)], dtype=np.uint16)
+
+    def Load(self, listInput):
+        """
+        This function converts puzzle strings to (N, 9, 9) array of candidate bitmaps.
+        """
+        size = ClassicSudoku.size
+        digits = np.frombuffer(''.join(listInput).encode('ascii'), dtype=np.uint8)
+        digits = (digits - ord('0')).reshape(len(listInput), size, size)
+        candidates = self.digit2BitMap[digits]
+        candidates[digits == 0] = ClassicSudoku.invert
+        return candidates
+
+    def CheckInput(self, listInput):
+        """
+        This function checks all puzzles at once: length and symbols, and the same digit given twice in a region.
+        In a region without duplicate, the sum of bitmaps of the givens is same as their bitwise OR.
+        Returns:
+            Tuple of (boolean array, True for valid puzzle ; list of puzzles, where puzzle not valid is replaced by empty puzzle)
+        """
+        cellCount = ClassicSudoku.cellCount
+        valid = np.array([ClassicSudoku.IsValidInput(strInput) for strInput in listInput], dtype=bool)
+        listInput = [strInput if ok else '0' * cellCount for strInput, ok in zip(listInput, valid)]
+        size = ClassicSudoku.size
+        digits = np.frombuffer(''.join(listInput).encode('ascii'), dtype=np.uint8)
+        givens = self.digit2BitMap[(digits - ord('0')).reshape(len(listInput), size, size)].astype(np.uint32)
+        for regions in (givens, givens.transpose(0, 2, 1), self.ToBlocks(givens)):
+            valid &= (regions.sum(axis=2) == self.RegionOr(regions)).all(axis=1)
+        return valid, listInput
+
+    @staticmethod
+    def IsSingle(candidates):
+        return (candidates != 0) & ((candidates & (candidates - 1)) == 0)
+
+    @staticmethod
+    def ToBlocks(grid):
+        """
+        This function rearranges (N, 9, 9) grid, so that grid[:, blockIndex, position] is a cell of the block.
+        The same function converts it back.
+        """
+        sqrt_size = ClassicSudoku.sqrt_size
+        count = grid.shape[0]
+        cells = grid.reshape(count, sqrt_size, sqrt_size, sqrt_size, sqrt_size)
+        return cells.transpose(0, 1, 3, 2, 4).reshape(grid.shape)
+
+    @staticmethod
+    def RegionOr(regions):
+        """
+        This function returns bitwise OR of all cells of each region, for (N, 9 regions, 9 cells) array.
+        """
+        result = regions[:, :, 0].copy()
+        for position in range(1, ClassicSudoku.size):
+            result |= regions[:, :, position]
+        return result
+
+    def EliminateNakedSingles(self, grid):
+        sqrt_size = ClassicSudoku.sqrt_size
+        single = self.IsSingle(grid)
+        fixed = np.where(single, grid, 0).astype(np.uint16)
+        rowFixed = self.RegionOr(fixed)
+        colFixed = self.RegionOr(fixed.transpose(0, 2, 1))
+        blockFixed = self.RegionOr(self.ToBlocks(fixed)).reshape(-1, sqrt_size, sqrt_size)
+        blockFixed = blockFixed.repeat(sqrt_size, axis=1).repeat(sqrt_size, axis=2)
+        peerFixed = rowFixed[:, :, None] | colFixed[:, None, :] | blockFixed
+        return np.where(single, grid, grid & ~peerFixed).astype(np.uint16)
+
+    def SetHiddenSingles(self, regions):
+        """
+        This function sets hidden singles in (N, 9 regions, 9 cells) array, and returns new array.
+        """
+        once = np.zeros(regions.shape[:2], dtype=np.uint16)
+        twice = np.zeros_like(once)
+        for position in range(ClassicSudoku.size):
+            value = regions[:, :, position]
+            twice |= once & value
+            once |= value
+        hit = regions & (once & ~twice)[:, :, None]
+        return np.where(hit != 0, hit, regions)
+
+    @staticmethod
+    def OthersOr(values, axis):
+        """
+        This function returns, for each of the 3 entries along axis, bitwise OR of the other two entries.
+        """
+        a, b, c = (np.take(values, i, axis=axis) for i in range(3))
+        return np.stack((b | c, a | c, a | b), axis=axis)
+
+    def ReduceBoxLine(self, grid):
+        """
+        This function applies box-line reduction along rows of grid (N, 9, 9).
+        Columns are handled by calling it with transposed grid.
+        """
+        count = grid.shape[0]
+        sqrt_size = ClassicSudoku.sqrt_size
+        # segment = 3 cells of one row inside one block. Shape (N, band, row in band, stack)
+        cells = grid.reshape(count, sqrt_size, sqrt_size, sqrt_size, sqrt_size)
+        segment = cells[..., 0] | cells[..., 1] | cells[..., 2]
+        # Digits of segment, absent in other rows of the block: remove from other blocks of the row
+        pointing = segment & ~self.OthersOr(segment, axis=2)
+        # Digits of segment, absent in other blocks of the row: remove from other rows of the block
+        claiming = segment & ~self.OthersOr(segment, axis=3)
+        eliminate = self.OthersOr(pointing, axis=3) | self.OthersOr(claiming, axis=2)
+        return (cells & ~eliminate[..., None]).reshape(grid.shape).astype(np.uint16)
+
+    def Propagate(self, grid):
+        """
+        This function applies all vectorized techniques until no puzzle changes any more.
+        Puzzles which did not change in a round are dropped from the next rounds.
+        """
+        grid = grid.copy()
+        active = np.arange(grid.shape[0])
+        for round in range(self.maxRounds):
+            if active.size == 0:
+                break
+            previous = grid[active]
+            current = self.EliminateNakedSingles(previous)
+            current = self.SetHiddenSingles(current)
+            current = self.SetHiddenSingles(current.transpose(0, 2, 1)).transpose(0, 2, 1)
+            current = self.ToBlocks(self.SetHiddenSingles(self.ToBlocks(current)))
+            current = self.ReduceBoxLine(current)
+            current = self.ReduceBoxLine(current.transpose(0, 2, 1)).transpose(0, 2, 1)
+            grid[active] = current
+            active = active[(current != previous).any(axis=(1, 2))]
+        return grid
+
+    def SolveBatch(self, listInput):
+        """
+        This function solves list of puzzles.
+        Parameters:
+            listInput: list of 81 character puzzle strings
+        Returns:
+            List of solution strings, '' for puzzle without solution or not valid
+        """
+        if not listInput:
+            return []
+        valid, listInput = self.CheckInput(listInput)
+        grid = self.Propagate(self.Load(listInput))
+        single = self.IsSingle(grid)
+        digits = np.where(single, self.bitMap2digit[grid], 0) + ord('0')
+        rows = digits.astype(np.uint8).tobytes()
+        solved = single.all(axis=(1, 2))
+        # Every region of a solved puzzle has all digits
+        for regions in (grid, grid.transpose(0, 2, 1), self.ToBlocks(grid)):
+            solved &= (self.RegionOr(regions) == ClassicSudoku.invert).all(axis=1)
+
+        listOutput = []
+        cellCount = ClassicSudoku.cellCount
+        for i in range(len(listInput)):
+            strOutput = rows[i * cellCount:(i + 1) * cellCount].decode('ascii')
+            if not valid[i]:
+                strOutput = ''
+            elif not solved[i]:
+                # Leftover: continue from the filled cells with the scalar solver
+                s = ClassicSudoku()
+                try:
+                    s.Load(strOutput)
+                    s.Solve()
+                    strOutput = s.strOutput
+                except InvalidPuzzle:
+                    strOutput = ''
+            listOutput.append(strOutput)
+        return listOutput
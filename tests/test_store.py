@@ -0,0 +1,70 @@
+"""
+Regression tests of store.PuzzleStore.
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from store import PuzzleStore
+
+strPuzzle = '000006000059000008200008000045000000003000000006003054000325006000000000000000000'
+
+
+class PuzzleStoreThreadTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.dat')
+        os.close(handle)
+        os.remove(self.path)
+        self.store = PuzzleStore(self.path)
+        self.store.AppendMany([(strPuzzle, None, 1)] * 10)
+
+    def tearDown(self):
+        self.store.Close()
+        os.remove(self.path)
+
+    def testReadWhileAppending(self):
+        """
+        Readers must not see a closed map, while another thread appends and refreshes.
+        """
+        switchInterval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switchInterval)
+        listError = []
+        done = threading.Event()
+        iterator = self.store.Puzzles()
+        next(iterator)
+
+        def Reader():
+            while not done.is_set():
+                try:
+                    self.assertEqual(self.store.Get(5)[0], strPuzzle)
+                    self.assertEqual(self.store.GetPuzzle(9), strPuzzle)
+                except Exception as e:
+                    listError.append(e)
+
+        listThread = [threading.Thread(target=Reader) for _ in range(4)]
+        for thread in listThread:
+            thread.start()
+        try:
+            for _ in range(1000):
+                self.store.Append(strPuzzle, None, 2)
+                self.store.Refresh()
+        finally:
+            done.set()
+            for thread in listThread:
+                thread.join()
+        self.assertEqual(listError[:1], [])
+        # A generator started before the appends keeps reading its own map
+        self.assertEqual(list(iterator), [strPuzzle] * 9)
+        self.assertEqual(len(self.store), 1010)
+        self.assertEqual(len(self.store.GetIndexByGrade()[2]), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()